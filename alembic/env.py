@@ -1,7 +1,9 @@
+import os
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.engine import make_url
 
 from alembic import context
 
@@ -13,10 +15,17 @@ config = context.config
 # This line sets up loggers basically.
 fileConfig(config.config_file_name)
 
+# Migrate the same database the bot uses, through the backend's default synchronous driver
+if os.getenv('SAKUYA_DATABASE_URL'):
+    url = make_url(os.environ['SAKUYA_DATABASE_URL'])
+    url = url.set(drivername=url.get_backend_name())
+    # The config file format treats % as interpolation
+    config.set_main_option('sqlalchemy.url', url.render_as_string(hide_password=False).replace('%', '%%'))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
-from sakuya.db import db
-target_metadata = db.metadata
+from sakuya.db import Base
+target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -0,0 +1,24 @@
+"""Add Minecraft server address
+
+Revision ID: 3b1f6e0a52d4
+Revises: 9c7d2d638c77
+Create Date: 2026-10-19 16:02:10.481276
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6e0a52d4'
+down_revision = '9c7d2d638c77'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('guilds', sa.Column('minecraft_server_address', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('guilds', 'minecraft_server_address')
@@ -0,0 +1,24 @@
+"""Add Wordle hard mode
+
+Revision ID: 5d9a3c7e1b28
+Revises: c2e8d5a14f70
+Create Date: 2026-10-19 18:47:05.318664
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9a3c7e1b28'
+down_revision = 'c2e8d5a14f70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('guilds', sa.Column('wordle_hard_mode', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    op.drop_column('guilds', 'wordle_hard_mode')
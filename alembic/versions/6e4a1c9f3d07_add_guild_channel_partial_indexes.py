@@ -0,0 +1,30 @@
+"""Add partial indexes on guild channel columns
+
+Revision ID: 6e4a1c9f3d07
+Revises: 8f2b6d4e9a15
+Create Date: 2026-10-19 20:41:08.213574
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e4a1c9f3d07'
+down_revision = '8f2b6d4e9a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_guilds_sentinel_channel_id', 'guilds', ['sentinel_channel_id'], unique=False,
+                    sqlite_where=sa.text('sentinel_channel_id IS NOT NULL'),
+                    postgresql_where=sa.text('sentinel_channel_id IS NOT NULL'))
+    op.create_index('ix_guilds_minecraft_channel_id', 'guilds', ['minecraft_channel_id'], unique=False,
+                    sqlite_where=sa.text('minecraft_channel_id IS NOT NULL'),
+                    postgresql_where=sa.text('minecraft_channel_id IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_guilds_minecraft_channel_id', table_name='guilds')
+    op.drop_index('ix_guilds_sentinel_channel_id', table_name='guilds')
@@ -0,0 +1,24 @@
+"""Add Wordle word length
+
+Revision ID: 897e6c64473c
+Revises: e503f105f0b8
+Create Date: 2026-10-19 14:52:10.204817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '897e6c64473c'
+down_revision = 'e503f105f0b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('guilds', sa.Column('wordle_word_length', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('guilds', 'wordle_word_length')
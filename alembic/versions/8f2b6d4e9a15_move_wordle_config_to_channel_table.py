@@ -0,0 +1,54 @@
+"""Move Wordle configuration to a channel table
+
+Revision ID: 8f2b6d4e9a15
+Revises: 5d9a3c7e1b28
+Create Date: 2026-10-19 19:36:12.550817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2b6d4e9a15'
+down_revision = '5d9a3c7e1b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('wordle_channels',
+    sa.Column('channel_id', sa.Integer(), nullable=False),
+    sa.Column('guild_id', sa.Integer(), nullable=False),
+    sa.Column('word_length', sa.Integer(), server_default=sa.text('5'), nullable=False),
+    sa.Column('board_mode', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('hard_mode', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('channel_id')
+    )
+    op.create_index(op.f('ix_wordle_channels_guild_id'), 'wordle_channels', ['guild_id'], unique=False)
+    op.execute(
+        'INSERT INTO wordle_channels (channel_id, guild_id, word_length, board_mode, hard_mode) '
+        'SELECT wordle_channel_id, id, coalesce(wordle_word_length, 5), wordle_board_mode, wordle_hard_mode '
+        'FROM guilds WHERE wordle_channel_id IS NOT NULL'
+    )
+    op.drop_column('guilds', 'wordle_hard_mode')
+    op.drop_column('guilds', 'wordle_board_mode')
+    op.drop_column('guilds', 'wordle_word_length')
+    op.drop_column('guilds', 'wordle_channel_id')
+
+
+def downgrade():
+    op.add_column('guilds', sa.Column('wordle_channel_id', sa.INTEGER(), nullable=True))
+    op.add_column('guilds', sa.Column('wordle_word_length', sa.INTEGER(), nullable=True))
+    op.add_column('guilds', sa.Column('wordle_board_mode', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('guilds', sa.Column('wordle_hard_mode', sa.Boolean(), server_default=sa.false(), nullable=False))
+    # Only one channel per guild fits; keep the oldest
+    op.execute(
+        'UPDATE guilds SET (wordle_channel_id, wordle_word_length, wordle_board_mode, wordle_hard_mode) = ('
+        'SELECT channel_id, word_length, board_mode, hard_mode FROM wordle_channels '
+        'WHERE wordle_channels.guild_id = guilds.id ORDER BY channel_id LIMIT 1'
+        ') WHERE id IN (SELECT guild_id FROM wordle_channels)'
+    )
+    op.drop_index(op.f('ix_wordle_channels_guild_id'), table_name='wordle_channels')
+    op.drop_table('wordle_channels')
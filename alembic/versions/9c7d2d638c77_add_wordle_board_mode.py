@@ -0,0 +1,24 @@
+"""Add Wordle board mode
+
+Revision ID: 9c7d2d638c77
+Revises: 897e6c64473c
+Create Date: 2026-10-19 15:21:44.913562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c7d2d638c77'
+down_revision = '897e6c64473c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('guilds', sa.Column('wordle_board_mode', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    op.drop_column('guilds', 'wordle_board_mode')
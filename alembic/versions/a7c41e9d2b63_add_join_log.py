@@ -0,0 +1,37 @@
+"""Add join log
+
+Revision ID: a7c41e9d2b63
+Revises: 3b1f6e0a52d4
+Create Date: 2026-10-19 17:12:37.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c41e9d2b63'
+down_revision = '3b1f6e0a52d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('join_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('guild_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('joined_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('flagged', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_join_log_guild_id_joined_at', 'join_log', ['guild_id', 'joined_at'], unique=False)
+    op.create_index('ix_join_log_joined_at', 'join_log', ['joined_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_join_log_joined_at', table_name='join_log')
+    op.drop_index('ix_join_log_guild_id_joined_at', table_name='join_log')
+    op.drop_table('join_log')
@@ -0,0 +1,24 @@
+"""Add wordle extra_rounds
+
+Revision ID: b4d7e2a9c6f1
+Revises: 6e4a1c9f3d07
+Create Date: 2026-10-19 22:14:37.904152
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d7e2a9c6f1'
+down_revision = '6e4a1c9f3d07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('wordle_channels', sa.Column('extra_rounds', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade():
+    op.drop_column('wordle_channels', 'extra_rounds')
@@ -0,0 +1,24 @@
+"""Add join log purged_at
+
+Revision ID: c2e8d5a14f70
+Revises: a7c41e9d2b63
+Create Date: 2026-10-19 18:03:51.662940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e8d5a14f70'
+down_revision = 'a7c41e9d2b63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('join_log', sa.Column('purged_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('join_log', 'purged_at')
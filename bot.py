@@ -6,4 +6,6 @@ load_dotenv()
 
 from sakuya.client import start
 
-asyncio.run(start(os.getenv('DISCORD_TOKEN')))
+# Worker processes import this module too, and mustn't start a bot of their own
+if __name__ == '__main__':
+    asyncio.run(start(os.getenv('DISCORD_TOKEN')))
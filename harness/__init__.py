@@ -0,0 +1,30 @@
+import asyncio
+
+from sakuya.wordle.game import parse_cache_info
+from .fakes import FakeContext, FakeEmoji, FakeGuild, FakeMember, FakeMessage, FakeTextChannel, HarnessBot, use_memory_db
+from .runner import Report, drive
+from .scenarios import SCENARIOS
+
+
+async def run_scenario(name: str, guilds: int = 20, count: int = 1000, rate: float | None = None) -> Report:
+    """Replays one of the `SCENARIOS` against a fresh bot and in-memory database."""
+    engine = await use_memory_db()
+    bot = HarnessBot()
+    try:
+        events, fake_guilds = await SCENARIOS[name](bot, guilds=guilds, count=count)
+        # Without workers the cache lives on between scenarios, so only count what this one added
+        before = await parse_cache_info()
+        report = await drive(name, events, rate)
+        # Let deferred work like join log flushes finish so it's included in the outbound count
+        await asyncio.gather(*(asyncio.all_tasks() - {asyncio.current_task()}))
+        report.outbound = sum(g.outbound for g in fake_guilds)
+        after = await parse_cache_info()
+        if after.hits + after.misses > before.hits + before.misses:
+            report.parse_cache = after._replace(
+                hits=after.hits - before.hits, misses=after.misses - before.misses,
+                evictions=after.evictions - before.evictions
+            )
+        return report
+    finally:
+        await bot.close()
+        await engine.dispose()
@@ -0,0 +1,33 @@
+"""Offline load test for the cogs.
+
+Usage: python -m harness join-flood --guilds 50 --count 10000 --rate 2000 [--workers 4]
+"""
+import argparse
+import asyncio
+import logging
+
+from sakuya import workers
+from . import SCENARIOS, run_scenario
+
+
+parser = argparse.ArgumentParser(prog='python -m harness', description='Replay synthetic traffic against the cogs.')
+parser.add_argument('scenarios', nargs='*', metavar='scenario', help=f'any of {", ".join(SCENARIOS)} (default: all)')
+parser.add_argument('--guilds', type=int, default=20, help='number of fake guilds (default: 20)')
+parser.add_argument('--count', type=int, default=1000, help='events per scenario (default: 1000)')
+parser.add_argument('--rate', type=float, default=None, help='events per second (default: as fast as possible)')
+parser.add_argument('--workers', type=int, default=0, help='worker processes for CPU-heavy work (default: none)')
+
+# Worker processes import this module too, and mustn't run the scenarios themselves
+if __name__ == '__main__':
+    args = parser.parse_args()
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f'unknown scenario: {scenario}')
+
+    # The cogs log every alert and warning; only show what the harness itself reports
+    logging.basicConfig(level=logging.ERROR)
+
+    for scenario in args.scenarios or SCENARIOS:
+        workers.configure(args.workers)
+        print(asyncio.run(run_scenario(scenario, guilds=args.guilds, count=args.count, rate=args.rate)))
+    workers.pool.shutdown()
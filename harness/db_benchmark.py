@@ -0,0 +1,198 @@
+"""Benchmark of the startup queries and write paths against a large database, with and without the tuning in `sakuya.db`.
+
+Usage: python -m harness.db_benchmark --guilds 100000 --enabled 1000 [--repeat 20]
+
+Each configuration gets a fresh database file, since the journal mode and indexes are properties of the file.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from sakuya import join_log
+from sakuya.db import Base, Guild, JoinLog, Session, SQLITE_PRAGMAS, WordleChannel, create_engine
+from .runner import percentile
+
+
+SEED_BATCH_SIZE = 10_000
+JOINS_PER_GUILD = 20
+
+
+@dataclass
+class Configuration:
+    name: str
+    pragmas: dict[str, str]
+    partial_indexes: bool
+
+
+CONFIGURATIONS = [
+    # What the bot ran with before it had any tuning
+    Configuration('untuned', {'foreign_keys': 'ON'}, partial_indexes=False),
+    Configuration('tuned', SQLITE_PRAGMAS, partial_indexes=True),
+]
+
+STARTUP_QUERIES = {
+    'sentinel startup': select(Guild).where(Guild.sentinel_channel_id.isnot(None)),
+    'minecraft startup': select(Guild).where(Guild.minecraft_channel_id.isnot(None)),
+    'wordle startup': select(WordleChannel),
+}
+
+
+@dataclass
+class Timing:
+    name: str
+    # Seconds per run
+    samples: list[float] = field(default_factory=list, repr=False)
+
+    def __str__(self):
+        samples = sorted(self.samples)
+        ms = {p: percentile(samples, p) * 1000 for p in (50, 100)}
+        return f'{self.name}: p50 {ms[50]:.2f}ms, max {ms[100]:.2f}ms'
+
+
+@dataclass
+class BenchmarkReport:
+    configuration: str
+    guilds: int
+    seed_elapsed: float = 0.0
+    timings: list[Timing] = field(default_factory=list)
+    # How SQLite runs each startup query, to check the partial indexes are used
+    plans: dict[str, str] = field(default_factory=dict)
+
+    def __str__(self):
+        lines = [f'{self.configuration}: {self.guilds} guilds seeded in {self.seed_elapsed:.2f}s']
+        for timing in self.timings:
+            lines.append(f'  {timing}')
+            if timing.name in self.plans:
+                lines.append(f'    plan: {self.plans[timing.name]}')
+        return '\n'.join(lines)
+
+
+def _enabled_ids(guilds: int, enabled: int) -> list[int]:
+    step = max(guilds // max(enabled, 1), 1)
+    return list(range(1, guilds + 1, step))[:enabled]
+
+
+async def seed(engine: AsyncEngine, configuration: Configuration, guilds: int, enabled: int):
+    """Fills the database with `guilds` guilds, `enabled` of which use every cog and have some joins logged."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if not configuration.partial_indexes:
+            await conn.execute(text('DROP INDEX ix_guilds_sentinel_channel_id'))
+            await conn.execute(text('DROP INDEX ix_guilds_minecraft_channel_id'))
+    enabled_ids = set(_enabled_ids(guilds, enabled))
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    async with engine.begin() as conn:
+        for start in range(1, guilds + 1, SEED_BATCH_SIZE):
+            await conn.execute(insert(Guild), [
+                {
+                    'id': guild_id,
+                    'sentinel_channel_id': guild_id if guild_id in enabled_ids else None,
+                    'minecraft_channel_id': guild_id if guild_id in enabled_ids else None,
+                }
+                for guild_id in range(start, min(start + SEED_BATCH_SIZE, guilds + 1))
+            ])
+        if enabled_ids:
+            await conn.execute(insert(WordleChannel), [
+                {'channel_id': guild_id, 'guild_id': guild_id} for guild_id in enabled_ids
+            ])
+            await conn.execute(insert(JoinLog), [
+                {
+                    'guild_id': guild_id, 'user_id': guild_id * JOINS_PER_GUILD + i,
+                    'joined_at': now - timedelta(minutes=i), 'created_at': now - timedelta(days=1),
+                    'flagged': i % 2 == 0,
+                }
+                for guild_id in enabled_ids for i in range(JOINS_PER_GUILD)
+            ])
+
+
+async def measure(name: str, fn: Callable[[], Awaitable], repeat: int) -> Timing:
+    timing = Timing(name)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        timing.samples.append(time.perf_counter() - start)
+    return timing
+
+
+async def run_configuration(
+        configuration: Configuration, path: str, guilds: int, enabled: int, repeat: int
+) -> BenchmarkReport:
+    report = BenchmarkReport(configuration.name, guilds)
+    engine = create_engine(f'sqlite+aiosqlite:///{path}', pragmas=configuration.pragmas)
+    # The join log functions go through `Session`, as they do in the bot
+    Session.configure(bind=engine)
+    try:
+        start = time.perf_counter()
+        await seed(engine, configuration, guilds, enabled)
+        report.seed_elapsed = time.perf_counter() - start
+
+        for name, query in STARTUP_QUERIES.items():
+            async def load(query=query):
+                async with Session() as session:
+                    (await session.scalars(query)).all()
+            report.timings.append(await measure(name, load, repeat))
+            async with engine.connect() as conn:
+                plan = await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {query.compile(engine)}')
+                report.plans[name] = '; '.join(row[-1] for row in plan)
+
+        enabled_ids = _enabled_ids(guilds, enabled)
+        rng = random.Random(0)
+
+        async def enable():
+            # The same read-modify-commit as the cogs' enable commands, each in its own transaction
+            async with Session.begin() as session:
+                g = await session.get(Guild, rng.randint(1, guilds))
+                g.sentinel_channel_id = rng.randint(1, 2**62)
+        report.timings.append(await measure('settings update', enable, repeat))
+
+        buffer = join_log.JoinLogBuffer()
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        async def flush():
+            buffer.rows = [
+                {'guild_id': guild_id, 'user_id': rng.randint(1, 2**62), 'joined_at': now, 'created_at': now,
+                 'flagged': False}
+                for guild_id in rng.choices(enabled_ids or [1], k=join_log.BATCH_SIZE)
+            ]
+            await buffer.flush()
+        report.timings.append(await measure(f'join log flush ({join_log.BATCH_SIZE} joins)', flush, repeat))
+
+        since = datetime.now(timezone.utc) - timedelta(days=1)
+
+        async def purge():
+            guild_id = rng.choice(enabled_ids or [1])
+            user_ids = await join_log.unpurged_flagged_since(guild_id, since)
+            await join_log.mark_purged(guild_id, user_ids, datetime.now(timezone.utc))
+        report.timings.append(await measure('purge targets and progress', purge, repeat))
+        return report
+    finally:
+        await engine.dispose()
+
+
+async def run_benchmark(guilds: int = 100_000, enabled: int = 1000, repeat: int = 20) -> list[BenchmarkReport]:
+    reports = []
+    with tempfile.TemporaryDirectory() as directory:
+        for configuration in CONFIGURATIONS:
+            path = os.path.join(directory, f'{configuration.name}.sqlite')
+            reports.append(await run_configuration(configuration, path, guilds, enabled, repeat))
+    return reports
+
+
+parser = argparse.ArgumentParser(prog='python -m harness.db_benchmark', description=__doc__.split('\n')[0])
+parser.add_argument('--guilds', type=int, default=100_000, help='guilds in the database (default: 100000)')
+parser.add_argument('--enabled', type=int, default=1000, help='guilds with every cog enabled (default: 1000)')
+parser.add_argument('--repeat', type=int, default=20, help='runs of each query or write (default: 20)')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    for report in asyncio.run(run_benchmark(args.guilds, args.enabled, args.repeat)):
+        print(report)
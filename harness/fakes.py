@@ -0,0 +1,238 @@
+"""In-process stand-ins for the discord.py objects the cogs touch.
+
+They only implement what the cogs actually use, so they're cheap enough to create by the thousand.
+"""
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import discord
+from discord.ext import commands
+from sqlalchemy.pool import StaticPool
+
+from sakuya.db import Base, Session, create_engine
+
+
+_ids = itertools.count(10**17)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+@dataclass
+class FakeResponse:
+    """Enough of an aiohttp response for discord.py's HTTP exceptions."""
+    status: int
+    reason: str
+
+
+@dataclass(eq=False)
+class FakeRole:
+    id: int = field(default_factory=next_id)
+    name: str = '@everyone'
+
+
+@dataclass(eq=False)
+class FakeEmoji:
+    name: str
+    id: int = field(default_factory=next_id)
+    animated: bool = False
+
+
+@dataclass(eq=False)
+class FakeMember:
+    guild: 'FakeGuild'
+    name: str
+    id: int = field(default_factory=next_id)
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    joined_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    roles: list[FakeRole] = field(default_factory=lambda: [FakeRole()])
+    avatar: object = None
+    bot: bool = False
+    guild_permissions: discord.Permissions = field(default_factory=discord.Permissions.all)
+
+    @property
+    def mention(self) -> str:
+        return f'<@{self.id}>'
+
+    @property
+    def display_name(self) -> str:
+        return self.name
+
+    def __str__(self):
+        return self.name
+
+
+@dataclass(eq=False)
+class FakeMessage:
+    channel: 'FakeTextChannel'
+    content: str
+    author: FakeMember | None = None
+    id: int = field(default_factory=next_id)
+    edits: int = 0
+
+    @property
+    def guild(self) -> 'FakeGuild':
+        return self.channel.guild
+
+    async def edit(self, *, content: str = None, **kwargs):
+        self.channel.outbound += 1
+        self.edits += 1
+        if content is not None:
+            self.content = content
+        return self
+
+    async def add_reaction(self, emoji):
+        self.channel.outbound += 1
+
+
+@dataclass(eq=False)
+class FakeTextChannel:
+    guild: 'FakeGuild'
+    name: str = 'general'
+    id: int = field(default_factory=next_id)
+    # Number of API calls the bot made in this channel
+    outbound: int = 0
+    # Only the most recent messages are kept so long runs don't grow without bound
+    history_limit: int = 50
+    history: list[FakeMessage] = field(default_factory=list)
+
+    @property
+    def mention(self) -> str:
+        return f'<#{self.id}>'
+
+    def permissions_for(self, member) -> discord.Permissions:
+        return discord.Permissions.all()
+
+    async def send(self, content: str = None, **kwargs) -> FakeMessage:
+        self.outbound += 1
+        message = FakeMessage(channel=self, content=content, author=self.guild.me)
+        self.history.append(message)
+        if len(self.history) > self.history_limit:
+            del self.history[0]
+        return message
+
+    def get_partial_message(self, message_id: int) -> FakeMessage:
+        return next((m for m in self.history if m.id == message_id), None) or FakeMessage(
+            channel=self, content=None, author=self.guild.me, id=message_id
+        )
+
+    @asynccontextmanager
+    async def typing(self):
+        yield
+
+
+@dataclass(eq=False)
+class FakeGuild:
+    name: str
+    id: int = field(default_factory=next_id)
+    member_count: int = 0
+    channels: dict[int, FakeTextChannel] = field(default_factory=dict)
+    members: list[FakeMember] = field(default_factory=list)
+    emojis: list[FakeEmoji] = field(default_factory=list)
+    me: FakeMember = None
+    owner_id: int = None
+    # User id to "ban" or "kick", for every member the bot removed, and the number of requests it took
+    removed: dict[int, str] = field(default_factory=dict)
+    removal_requests: int = 0
+    # Users the bot isn't allowed to remove, like those with a higher role
+    protected: set[int] = field(default_factory=set)
+    # Simulated time each ban or kick request takes
+    removal_latency: float = 0
+
+    def __post_init__(self):
+        self.me = self.me or FakeMember(guild=self, name='Sakuya', bot=True)
+        self.owner_id = self.owner_id or next_id()
+
+    @property
+    def chunked(self) -> bool:
+        return len(self.members) >= self.member_count
+
+    async def chunk(self, *, cache: bool = True) -> list[FakeMember]:
+        return list(self.members)
+
+    async def _remove(self, user, action: str):
+        self.removal_requests += 1
+        await asyncio.sleep(self.removal_latency)
+        if user.id in self.protected:
+            raise discord.Forbidden(FakeResponse(403, 'Forbidden'), 'Missing Permissions')
+        self.removed[user.id] = action
+
+    async def ban(self, user, *, reason: str = None, delete_message_seconds: int = 0):
+        await self._remove(user, 'ban')
+
+    async def kick(self, user, *, reason: str = None):
+        await self._remove(user, 'kick')
+
+    def add_channel(self, name: str = 'general') -> FakeTextChannel:
+        channel = FakeTextChannel(guild=self, name=name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_channel_or_thread(self, channel_id: int) -> FakeTextChannel | None:
+        return self.channels.get(channel_id)
+
+    def get_channel(self, channel_id: int) -> FakeTextChannel | None:
+        return self.channels.get(channel_id)
+
+    @property
+    def text_channels(self) -> list[FakeTextChannel]:
+        return list(self.channels.values())
+
+    @property
+    def outbound(self) -> int:
+        return sum(c.outbound for c in self.channels.values())
+
+
+class FakeContext:
+    def __init__(self, bot: commands.Bot, channel: FakeTextChannel, author: FakeMember, content: str = ''):
+        self.bot = bot
+        self.channel = channel
+        self.author = author
+        self.message = FakeMessage(channel=channel, content=content, author=author)
+        self.invoked_subcommand = None
+
+    @property
+    def guild(self) -> FakeGuild:
+        return self.channel.guild
+
+    @property
+    def me(self) -> FakeMember:
+        return self.guild.me
+
+    async def send(self, content: str = None, **kwargs) -> FakeMessage:
+        return await self.channel.send(content, **kwargs)
+
+    def typing(self):
+        return self.channel.typing()
+
+
+class HarnessBot(commands.Bot):
+    """A bot that never connects, serving fake guilds to the cogs instead."""
+    def __init__(self):
+        super().__init__(command_prefix='Maid, ', intents=discord.Intents.default(), help_command=None)
+        self.fake_guilds: dict[int, FakeGuild] = dict()
+        self.owner_id = next_id()
+
+    def add_guild(self, guild: FakeGuild):
+        self.fake_guilds[guild.id] = guild
+
+    def get_guild(self, guild_id: int, /) -> FakeGuild | None:
+        return self.fake_guilds.get(guild_id)
+
+    @property
+    def guilds(self) -> list[FakeGuild]:
+        return list(self.fake_guilds.values())
+
+
+async def use_memory_db():
+    """Rebinds `sakuya.db.Session` to a fresh in-memory SQLite database with all tables created."""
+    # StaticPool keeps a single connection open, otherwise every connection would get its own empty database
+    engine = create_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session.configure(bind=engine)
+    return engine
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+
+from sakuya.wordle.guess import CacheInfo
+
+
+logger = logging.getLogger(__name__)
+
+Event = Callable[[], Awaitable]
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+@dataclass
+class Report:
+    scenario: str
+    events: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    outbound: int = 0
+    # Guess parsing during the scenario, across all workers; None if nothing was parsed
+    parse_cache: CacheInfo | None = None
+    # Seconds from when an event was due until its handler finished, so queueing delay is included
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+    @property
+    def throughput(self) -> float:
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        latencies = sorted(self.latencies)
+        ms = {p: percentile(latencies, p) * 1000 for p in (50, 95, 99, 100)}
+        return (
+            f'{self.scenario}: {self.events} events in {self.elapsed:.2f}s ({self.throughput:.0f}/s), '
+            f'{self.errors} errors\n'
+            f'  latency p50 {ms[50]:.2f}ms, p95 {ms[95]:.2f}ms, p99 {ms[99]:.2f}ms, max {ms[100]:.2f}ms\n'
+            f'  outbound messages: {self.outbound}'
+            + (f'\n  parse cache: {self.parse_cache}' if self.parse_cache else '')
+        )
+
+
+async def drive(scenario: str, events: Iterable[Event], rate: float | None = None) -> Report:
+    """Runs events against the cogs and measures how long each one takes.
+
+    With a rate (events per second) events are released on a fixed schedule whether or not earlier ones have finished,
+    like real gateway traffic. Without one, events run back to back as fast as the handlers allow.
+    """
+    report = Report(scenario)
+    tasks = set()
+
+    async def timed(event: Event, due: float):
+        try:
+            await event()
+        except Exception:
+            report.errors += 1
+            logger.exception('Handler raised during replay')
+        report.latencies.append(time.perf_counter() - due)
+        report.events += 1
+
+    start = time.perf_counter()
+    for i, event in enumerate(events):
+        if not rate:
+            await timed(event, time.perf_counter())
+            continue
+        due = start + i / rate
+        delay = due - time.perf_counter()
+        # Yield regularly even when behind schedule so released events get to run
+        await asyncio.sleep(max(delay, 0))
+        task = asyncio.create_task(timed(event, due))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,138 @@
+"""Synthetic traffic for the cogs.
+
+Each scenario sets up its guilds and cog, then returns the events to replay along with the guilds so the outbound
+message count can be collected afterwards.
+"""
+import functools
+import random
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+
+from sakuya.db import Session, Guild, WordleChannel
+from sakuya.hewo import Hewo
+from sakuya.sentinel import Sentinel
+from sakuya.wordle import Wordle
+from sakuya.wordle.data import word_data
+from sakuya.wordle.guess import DISCORD_EMOTE_REGEX
+from .fakes import FakeContext, FakeEmoji, FakeGuild, FakeMember, FakeMessage, HarnessBot
+from .runner import Event
+
+
+GUESS_SAMPLES = [
+    '🦈', '🤡', '🤸‍♀️', '👨‍⚖️', '🍳', 's🐑r', '🅰️Y🅰️Y🅰️', '🐟<:y_grey:931613702199857243>', '👩‍✈️', '👍🏻',
+    '<:AYAYA:618951000916754432>', '<:lawnmower:927011154868449350>', '<:AYAYAWeird:807004237573390428>',
+    's<:tetriuTea:828458481857593344>m', r'¯\_(ツ)_/¯',
+]
+INVALID_GUESS_SAMPLES = ['xqzzt', 'aaaaa', 'hello world', 'toolongword', 'hi', '🦈🦈🦈🦈🦈🦈']
+CHAT_SAMPLES = [
+    'hewo', 'hewo hewo', 'good morning', 'did anyone see the patch notes?', 'lol', 'HEWO everyone',
+    'what time is the raid tonight', 'gg', 'brb', 'no way',
+]
+
+
+async def make_guilds(bot: HarnessBot, count: int, column: str | None = None) -> list[FakeGuild]:
+    """Creates guilds with one channel each and their database rows, storing the channel under `column` if given."""
+    guilds = []
+    async with Session.begin() as session:
+        for i in range(count):
+            guild = FakeGuild(name=f'Guild {i}', member_count=random.randint(10, 100_000))
+            channel = guild.add_channel()
+            bot.add_guild(guild)
+            guilds.append(guild)
+            session.add(Guild(id=guild.id, **({column: channel.id} if column else {})))
+    return guilds
+
+
+async def join_flood(bot: HarnessBot, guilds: int, count: int, young_ratio: float = 0.5):
+    """Bursts of member joins, a share of which are fresh accounts that should trip Sentinel."""
+    fake_guilds = await make_guilds(bot, guilds, 'sentinel_channel_id')
+    cog = Sentinel(bot)
+    await bot.add_cog(cog)
+    await cog.load_from_db()
+
+    def events() -> Iterator[Event]:
+        now = datetime.now(timezone.utc)
+        for i in range(count):
+            guild = random.choice(fake_guilds)
+            if random.random() < young_ratio:
+                created_at = now - timedelta(minutes=random.randint(1, 60 * 24 * 3))
+            else:
+                created_at = now - timedelta(days=random.randint(30, 3000))
+            member = FakeMember(guild=guild, name=f'raider{i}', created_at=created_at)
+            yield lambda m=member: cog.on_member_join(m)
+
+    return events(), fake_guilds
+
+
+async def guess_burst(
+        bot: HarnessBot, guilds: int, count: int, invalid_ratio: float = 0.2, board: bool = False, channels: int = 1
+):
+    """Wordle guesses spread over many guilds, and optionally several channels per guild, mixing plain words, emoji,
+    emotes and junk.
+    """
+    fake_guilds = await make_guilds(bot, guilds)
+    async with Session.begin() as session:
+        for guild in fake_guilds:
+            for channel in [*guild.channels.values(), *(guild.add_channel(f'wordle-{i}') for i in range(channels - 1))]:
+                session.add(WordleChannel(channel_id=channel.id, guild_id=guild.id, board_mode=board))
+    # Every guild owns the sample emotes, like a popular emote pack would be
+    emotes = [FakeEmoji(name=m.group(1), id=int(m.group(2))) for m in DISCORD_EMOTE_REGEX.finditer(''.join(GUESS_SAMPLES))]
+    for guild in fake_guilds:
+        guild.emojis = emotes
+    cog = Wordle(bot)
+    await bot.add_cog(cog)
+    await cog.load_from_db()
+    words = sorted(word_data().valid_guesses)
+
+    async def guess(guild: FakeGuild, text: str):
+        channel = random.choice(guild.text_channels)
+        state = cog.channels[channel.id]
+        # Guesses within three seconds of each other are dropped as accidental, and finished rounds only reply with
+        # a wait message; neither is interesting under load, so keep every round open for guessing.
+        state.last_guess_at = datetime.utcfromtimestamp(0)
+        if state.started() and state.finished():
+            cog.reset(channel.id)
+        ctx = FakeContext(bot, channel, FakeMember(guild=guild, name='player'), content=f'Maid, guess {text}')
+        await cog.guess(ctx, *text.split())
+
+    def events() -> Iterator[Event]:
+        for _ in range(count):
+            guild = random.choice(fake_guilds)
+            roll = random.random()
+            if roll < invalid_ratio:
+                text = random.choice(INVALID_GUESS_SAMPLES)
+            elif roll < (1 + invalid_ratio) / 2:
+                text = random.choice(GUESS_SAMPLES)
+            else:
+                text = random.choice(words)
+            yield lambda g=guild, t=text: guess(g, t)
+
+    return events(), fake_guilds
+
+
+async def chat(bot: HarnessBot, guilds: int, count: int):
+    """Ordinary chat messages, half of them in guilds owned by the bot owner so Hewo replies."""
+    fake_guilds = await make_guilds(bot, guilds)
+    for guild in fake_guilds[::2]:
+        guild.owner_id = bot.owner_id
+    cog = Hewo(bot)
+    await bot.add_cog(cog)
+
+    def events() -> Iterator[Event]:
+        for _ in range(count):
+            guild = random.choice(fake_guilds)
+            channel = next(iter(guild.channels.values()))
+            author = FakeMember(guild=guild, name='chatter')
+            message = FakeMessage(channel=channel, content=random.choice(CHAT_SAMPLES), author=author)
+            yield lambda m=message: cog.on_message(m)
+
+    return events(), fake_guilds
+
+
+SCENARIOS = {
+    'join-flood': join_flood,
+    'guess-burst': guess_burst,
+    'guess-burst-board': functools.partial(guess_burst, board=True),
+    'guess-burst-channels': functools.partial(guess_burst, channels=5),
+    'chat': chat,
+}
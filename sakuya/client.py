@@ -1,9 +1,13 @@
 import asyncio
 import os
+import signal
 
 import discord
 from discord.ext.commands import Bot
 
+from . import workers
+from .members import member_cache_flags, minimal_cache, report_cache_savings
+
 base_prefixes = [
     'Sakuya',
     'Maid robot',
@@ -37,17 +41,32 @@ bot = Bot(
     command_prefix=prefixes,
     intents=intents,
     help_command=None,
-    activity=discord.Activity(type=discord.ActivityType.watching, name='you')
+    activity=discord.Activity(type=discord.ActivityType.watching, name='you'),
+    member_cache_flags=member_cache_flags(),
+    chunk_guilds_at_startup=not minimal_cache()
 )
 
 
+@bot.listen()
+async def on_ready():
+    report_cache_savings(bot.guilds)
+
+
 async def start(token: str):
-    await asyncio.gather(
-        bot.load_extension('sakuya.settings'),
-        bot.load_extension('sakuya.hi'),
-        bot.load_extension('sakuya.hewo'),
-        bot.load_extension('sakuya.sentinel'),
-        bot.load_extension('sakuya.minecraft'),
-        bot.load_extension('sakuya.wordle'),
-    )
-    await bot.start(token)
+    # A deploy stops the bot with SIGTERM; treat it like Ctrl-C, so the cleanup below runs either way
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        # Closing the bot on the way out unloads the cogs, which snapshot their state
+        async with bot:
+            await asyncio.gather(
+                bot.load_extension('sakuya.settings'),
+                bot.load_extension('sakuya.hi'),
+                bot.load_extension('sakuya.hewo'),
+                bot.load_extension('sakuya.sentinel'),
+                bot.load_extension('sakuya.minecraft'),
+                bot.load_extension('sakuya.wordle'),
+            )
+            await bot.start(token)
+    finally:
+        # The cogs still need the workers while unloading, so they go last
+        workers.pool.shutdown()
@@ -1,17 +1,63 @@
-from sqlalchemy import event, ForeignKey, TEXT
-from sqlalchemy.engine import Engine
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-
+import logging
+import os
+import re
+from datetime import datetime
 
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")
-    cursor.close()
+from sqlalchemy import event, false, ForeignKey, Index, make_url, text, TEXT
+from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
-engine = create_async_engine("sqlite+aiosqlite:///db.sqlite")
+DATABASE_URL = os.getenv('SAKUYA_DATABASE_URL', 'sqlite+aiosqlite:///db.sqlite')
+# Applied to every new SQLite connection; see https://www.sqlite.org/pragma.html
+SQLITE_PRAGMAS = {
+    'foreign_keys': 'ON',
+    # Readers don't block the writer (and vice versa), and a commit is an append rather than a rewrite of the journal
+    'journal_mode': os.getenv('SAKUYA_SQLITE_JOURNAL_MODE', 'WAL'),
+    # With WAL, NORMAL can only lose the last commits on power loss, never corrupt the database
+    'synchronous': os.getenv('SAKUYA_SQLITE_SYNCHRONOUS', 'NORMAL'),
+    # Negative sizes are in KiB rather than pages
+    'cache_size': os.getenv('SAKUYA_SQLITE_CACHE_SIZE', '-32000'),
+}
+# Connection pool settings, passed on to the engine only if set. They only apply to other backends: SQLAlchemy gives
+# SQLite a fresh connection per session (NullPool), as opening one is just opening a file, so there's no pool to tune.
+POOL_OPTIONS = {
+    option: int(os.environ[f'SAKUYA_DB_{option.upper()}'])
+    for option in ('pool_size', 'max_overflow', 'pool_recycle')
+    if os.getenv(f'SAKUYA_DB_{option.upper()}')
+}
+PRAGMA_VALUE_REGEX = re.compile(r'-?\w+')
+
+logger = logging.getLogger(__name__)
+
+
+def create_engine(url: str = DATABASE_URL, pragmas: dict[str, str] = None, **kwargs) -> AsyncEngine:
+    """Creates an engine, setting `pragmas` (by default `SQLITE_PRAGMAS`) on each connection if it's SQLite."""
+    engine = create_async_engine(url, **kwargs)
+    if engine.dialect.name == 'sqlite':
+        pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+        for name, value in pragmas.items():
+            # Pragmas can't take bound parameters
+            if not PRAGMA_VALUE_REGEX.fullmatch(str(value)):
+                raise ValueError(f'Invalid value for SQLite pragma {name}: {value}')
+
+        @event.listens_for(engine.sync_engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+            cursor.close()
+    return engine
+
+
+def pool_options(url: str = DATABASE_URL) -> dict[str, int]:
+    if POOL_OPTIONS and make_url(url).get_backend_name() == 'sqlite':
+        logger.warning(f'Ignoring connection pool settings {", ".join(POOL_OPTIONS)}, as SQLite has no pool to tune.')
+        return {}
+    return POOL_OPTIONS
+
+
+engine = create_engine(**pool_options())
 Session = async_sessionmaker(engine, expire_on_commit=False)
 
 
@@ -24,14 +70,24 @@ class Base(AsyncAttrs, DeclarativeBase):
 class Guild(Base):
     __tablename__ = 'guilds'
 
+    __table_args__ = (
+        # Each cog loads only the guilds it's enabled in at startup, which are few compared to all guilds
+        Index('ix_guilds_sentinel_channel_id', 'sentinel_channel_id',
+              sqlite_where=text('sentinel_channel_id IS NOT NULL'),
+              postgresql_where=text('sentinel_channel_id IS NOT NULL')),
+        Index('ix_guilds_minecraft_channel_id', 'minecraft_channel_id',
+              sqlite_where=text('minecraft_channel_id IS NOT NULL'),
+              postgresql_where=text('minecraft_channel_id IS NOT NULL')),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     sentinel_channel_id: Mapped[int | None]
 
     minecraft_channel_id: Mapped[int | None]
     minecraft_rcon_address: Mapped[str | None]
     minecraft_rcon_pass: Mapped[str | None]
-
-    wordle_channel_id: Mapped[int | None]
+    # host[:port] for status pings, if it differs from the RCON host or uses a port other than 25565
+    minecraft_server_address: Mapped[str | None]
 
     members: Mapped[list['Member']] = relationship(
         back_populates='guild', cascade='save-update, merge, expunge, delete, delete-orphan'
@@ -46,3 +102,36 @@ class Member(Base):
     guild: Mapped['Guild'] = relationship(back_populates='members')
 
     minecraft_username: Mapped[str | None]
+
+
+class JoinLog(Base):
+    """Every join in guilds with Sentinel enabled, kept for a while to look back on raids."""
+    __tablename__ = 'join_log'
+    __table_args__ = (
+        # "Who joined this guild since..." is a range scan, and retention deletes from the oldest end
+        Index('ix_join_log_guild_id_joined_at', 'guild_id', 'joined_at'),
+        Index('ix_join_log_joined_at', 'joined_at'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    guild_id: Mapped[int] = mapped_column(ForeignKey('guilds.id'))
+    user_id: Mapped[int]
+    # Naive UTC, as SQLite doesn't store time zones
+    joined_at: Mapped[datetime]
+    created_at: Mapped[datetime]
+    flagged: Mapped[bool]
+    # Set once a raid purge has banned or kicked the user, so an interrupted purge can pick up where it left off
+    purged_at: Mapped[datetime | None]
+
+
+class WordleChannel(Base):
+    __tablename__ = 'wordle_channels'
+
+    channel_id: Mapped[int] = mapped_column(primary_key=True)
+    guild_id: Mapped[int] = mapped_column(ForeignKey('guilds.id'), index=True)
+
+    word_length: Mapped[int] = mapped_column(default=5, server_default=text('5'))
+    board_mode: Mapped[bool] = mapped_column(default=False, server_default=false())
+    hard_mode: Mapped[bool] = mapped_column(default=False, server_default=false())
+    # Extra rounds played so far, which each move the channel one word further along its word schedule
+    extra_rounds: Mapped[int] = mapped_column(default=0, server_default=text('0'))
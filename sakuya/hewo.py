@@ -1,5 +1,6 @@
 import random
 
+import discord
 from discord.ext import commands
 
 
@@ -35,7 +36,9 @@ class Hewo(commands.Cog):
         if message.author == self.bot.user:
             return
 
-        if await self.bot.is_owner(message.channel.guild.owner) and (hewos := message.content.lower().count('hewo')):
+        # The owner may not be in the member cache, but their ID is always known
+        owner = discord.Object(message.channel.guild.owner_id)
+        if await self.bot.is_owner(owner) and (hewos := message.content.lower().count('hewo')):
             if random.random() > 0.99:
                 await message.channel.send(random.choice(RARE_HEWOS))
             else:
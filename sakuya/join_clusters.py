@@ -0,0 +1,171 @@
+"""Streaming detection of raids made up of similar-looking accounts.
+
+Every join is hashed into a fixed number of buckets: one per MinHash band of the username's character trigrams, and
+one for default-avatar accounts created around the same time. Joins sharing a bucket are compared, so each join costs
+a bounded amount of work no matter how many others are in the window, and expired joins leave their buckets in the
+order they came in.
+"""
+import hashlib
+import operator
+import random
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import discord
+
+from . import snapshot
+
+JOIN_WINDOW = timedelta(minutes=10)
+MAX_WINDOW_JOINS = 2000  # hard cap so a flood can't grow the window without bound
+MAX_BUCKET_JOINS = 50  # the oldest joins in a bucket are forgotten first; a cluster this big is obvious anyway
+MINHASH_BANDS = 8
+MINHASH_ROWS = 2  # per band; with 8 bands, names with a trigram Jaccard similarity of 0.5 share a band ~90% of the time
+SIMILARITY_THRESHOLD = 0.5  # fraction of matching MinHash values for two names to count as near-identical
+CREATION_BUCKET = timedelta(minutes=10)
+MIN_CLUSTER_SIZE = 3
+
+# MinHash permutations are (a * x + b) mod a Mersenne prime, applied to a hash of each trigram
+_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (rng.randrange(1, _PRIME), rng.randrange(_PRIME))
+    for rng in (random.Random(i) for i in range(MINHASH_BANDS * MINHASH_ROWS))
+]
+
+
+def _normalize(name: str) -> str:
+    # Raiders often only vary numbers or accents, e.g. raider_01, raider_02
+    name = unicodedata.normalize('NFKD', name.lower()).encode('ascii', 'ignore').decode()
+    return re.sub(r'\d+', '#', name)
+
+
+def _signature(name: str) -> tuple[int, ...]:
+    padded = f'^{_normalize(name)}$'
+    trigrams = {padded[i:i+3] for i in range(max(len(padded) - 2, 1))}
+    # Unlike hash(), this is the same in every process, so signatures still match after a restart
+    hashes = [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), 'little') for t in trigrams]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+class Joiner(NamedTuple):
+    """What the detector needs to know about a `discord.Member`, in a form that can be sent to worker processes."""
+    id: int
+    mention: str
+    name: str
+    created_at: datetime
+    avatar: str | None
+
+    @classmethod
+    def of(cls, member: discord.Member) -> 'Joiner':
+        return cls(member.id, member.mention, member.name, member.created_at, member.avatar and member.avatar.key)
+
+
+@dataclass(eq=False)
+class Join:
+    member_id: int
+    mention: str
+    joined_at: datetime
+    signature: tuple[int, ...]
+    # Only set for default-avatar accounts, which are matched by when they were created
+    created_bucket: float | None = None
+    buckets: list[tuple] = field(default_factory=list)
+
+    def similarity(self, other: 'Join') -> float:
+        return sum(map(operator.eq, self.signature, other.signature)) / len(self.signature)
+
+    def keys(self) -> list[tuple]:
+        keys = [
+            ('name', band, self.signature[band*MINHASH_ROWS:(band+1)*MINHASH_ROWS]) for band in range(MINHASH_BANDS)
+        ]
+        if self.created_bucket is not None:
+            keys.append(('created', self.created_bucket))
+        return keys
+
+
+@dataclass
+class JoinCluster:
+    joins: list[Join]
+    reasons: set[str]
+
+    def __len__(self):
+        return len(self.joins)
+
+    def describe(self, limit: int = 10) -> str:
+        mentions = ', '.join(j.mention for j in self.joins[:limit])
+        if len(self.joins) > limit:
+            mentions += f' and {len(self.joins) - limit} more'
+        return f'{len(self.joins)} recent joins with {" and ".join(sorted(self.reasons))}: {mentions}'
+
+
+class JoinClusterDetector:
+    def __init__(self):
+        self.window: deque[Join] = deque()
+        self.buckets: dict[tuple, deque[Join]] = dict()
+
+    def _expire(self, now: datetime):
+        while self.window and (now - self.window[0].joined_at > JOIN_WINDOW or len(self.window) > MAX_WINDOW_JOINS):
+            join = self.window.popleft()
+            for key in join.buckets:
+                bucket = self.buckets.get(key)
+                # Joins may already have been pushed out of a full bucket
+                if bucket and bucket[0] is join:
+                    bucket.popleft()
+                    if not bucket:
+                        del self.buckets[key]
+
+    def add(self, member: discord.Member | Joiner, now: datetime) -> JoinCluster | None:
+        """Records a join, and returns the cluster it belongs to if it looks like part of a coordinated raid."""
+        self._expire(now)
+        created_bucket = None
+        if member.avatar is None:
+            created_bucket = member.created_at.timestamp() // CREATION_BUCKET.total_seconds()
+        join = Join(member.id, member.mention, now, _signature(member.name), created_bucket)
+
+        matches: dict[Join, None] = dict()  # ordered set
+        reasons = set()
+        for key in join.keys():
+            bucket = self.buckets.setdefault(key, deque(maxlen=MAX_BUCKET_JOINS))
+            for other in bucket:
+                if other in matches:
+                    continue
+                if key[0] == 'created':
+                    matches[other] = None
+                    reasons.add('default avatars and matching account creation times')
+                elif join.similarity(other) >= SIMILARITY_THRESHOLD:
+                    matches[other] = None
+                    reasons.add('near-identical names')
+            bucket.append(join)
+            join.buckets.append(key)
+        self.window.append(join)
+
+        if len(matches) + 1 < MIN_CLUSTER_SIZE:
+            return None
+        return JoinCluster(joins=sorted(matches, key=lambda j: j.joined_at) + [join], reasons=reasons)
+
+    def dump(self) -> list[dict]:
+        """Returns the joins in the window as plain data, oldest first, for `load` to pick up after a restart."""
+        return [{
+            'member_id': join.member_id,
+            'mention': join.mention,
+            'joined_at': snapshot.dump_datetime(join.joined_at),
+            'signature': join.signature,
+            'created_bucket': join.created_bucket,
+        } for join in self.window]
+
+    @classmethod
+    def load(cls, joins: list[dict]) -> 'JoinClusterDetector':
+        detector = cls()
+        for saved in joins:
+            join = Join(
+                saved['member_id'], saved['mention'], snapshot.load_datetime(saved['joined_at']),
+                tuple(saved['signature']), saved['created_bucket']
+            )
+            join.buckets = join.keys()
+            # Replaying the joins in order fills the buckets just like adding them did, overflow included
+            for key in join.buckets:
+                detector.buckets.setdefault(key, deque(maxlen=MAX_BUCKET_JOINS)).append(join)
+            detector.window.append(join)
+        return detector
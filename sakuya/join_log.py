@@ -0,0 +1,110 @@
+"""Buffered writes to the join log, which keeps Sentinel's joins around for a while after a raid."""
+import asyncio
+import logging
+import re
+from datetime import datetime, time, timedelta, timezone
+
+import discord
+from sqlalchemy import delete, insert, select, update
+
+from .db import Session, JoinLog
+
+
+BATCH_SIZE = 200  # joins to buffer before writing them out without waiting for the next periodic flush
+FLUSH_INTERVAL = 5  # seconds
+MAX_BUFFERED = 20_000  # if the database is unavailable for long, drop the oldest joins rather than run out of memory
+RETENTION = timedelta(days=30)
+QUERY_LIMIT = 1000
+DURATION_REGEX = re.compile(r'(?:(\d+)\s*d)?\s*(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?', re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_since(text: str, now: datetime) -> datetime:
+    """Parses a point in time such as "2h", "1d 12h", "14:30" (UTC, within the last day) or "2024-01-31 14:30"."""
+    text = text.strip()
+    match = DURATION_REGEX.fullmatch(text)
+    if text and match:
+        days, hours, minutes = (int(g or 0) for g in match.groups())
+        return now - timedelta(days=days, hours=hours, minutes=minutes)
+    try:
+        parsed = time.fromisoformat(text)
+        since = datetime.combine(now.date(), parsed, timezone.utc)
+        return since - timedelta(days=1) if since > now else since
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f'Unrecognised time: {text}')
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class JoinLogBuffer:
+    def __init__(self):
+        self.rows: list[dict] = []
+        self._flushing: asyncio.Task = None
+
+    def add(self, member: discord.Member, joined_at: datetime, flagged: bool):
+        self.rows.append({
+            'guild_id': member.guild.id,
+            'user_id': member.id,
+            'joined_at': _naive_utc(joined_at),
+            'created_at': _naive_utc(member.created_at),
+            'flagged': flagged,
+        })
+        if len(self.rows) >= BATCH_SIZE and (not self._flushing or self._flushing.done()):
+            self._flushing = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        rows, self.rows = self.rows, []
+        if not rows:
+            return
+        try:
+            async with Session.begin() as session:
+                # A list of parameters makes this a single executemany rather than an insert per row
+                await session.execute(insert(JoinLog), rows)
+        except Exception as e:
+            logger.error(f'Unable to write {len(rows)} joins to the join log: {e}')
+            self.rows = (rows + self.rows)[-MAX_BUFFERED:]
+
+
+async def expire(now: datetime) -> int:
+    async with Session.begin() as session:
+        result = await session.execute(delete(JoinLog).where(JoinLog.joined_at < _naive_utc(now - RETENTION)))
+    return result.rowcount
+
+
+async def joins_since(guild_id: int, since: datetime) -> list[JoinLog]:
+    query = select(JoinLog).where(
+        JoinLog.guild_id == guild_id, JoinLog.joined_at >= _naive_utc(since)
+    ).order_by(JoinLog.joined_at).limit(QUERY_LIMIT)
+    async with Session() as session:
+        joins = (await session.scalars(query)).all()
+    for join in joins:
+        join.joined_at = join.joined_at.replace(tzinfo=timezone.utc)
+        join.created_at = join.created_at.replace(tzinfo=timezone.utc)
+    return joins
+
+
+async def unpurged_flagged_since(guild_id: int, since: datetime) -> list[int]:
+    """Returns the ids of flagged users who joined since the given time and haven't been purged yet, oldest first."""
+    query = select(JoinLog.user_id).where(
+        JoinLog.guild_id == guild_id, JoinLog.joined_at >= _naive_utc(since),
+        JoinLog.flagged, JoinLog.purged_at.is_(None)
+    ).order_by(JoinLog.joined_at)
+    async with Session() as session:
+        user_ids = (await session.scalars(query)).all()
+    # Users who rejoined during the raid show up more than once
+    return list(dict.fromkeys(user_ids))
+
+
+async def mark_purged(guild_id: int, user_ids: list[int], now: datetime):
+    async with Session.begin() as session:
+        await session.execute(update(JoinLog).where(
+            JoinLog.guild_id == guild_id, JoinLog.user_id.in_(user_ids), JoinLog.purged_at.is_(None)
+        ).values(purged_at=_naive_utc(now)))
@@ -0,0 +1,235 @@
+"""Minecraft server status via the Server List Ping protocol and RCON, with a per-server cache."""
+import asyncio
+import json
+import logging
+import re
+import struct
+import time
+from dataclasses import dataclass, field
+
+
+DEFAULT_PORT = 25565
+RCON_PORT = 25575
+STATUS_TTL = 60  # seconds
+TIMEOUT = 5  # seconds
+# Only the latest protocol version is guaranteed to get a proper response, but every server answers -1 somehow
+PROTOCOL_VERSION = -1
+# RCON packet types
+RCON_RESPONSE = 0
+RCON_COMMAND = 2
+RCON_LOGIN = 3
+LIST_REGEX = re.compile(r'There are (\d+) of a max(?: of)? (\d+) players online:?(.*)')
+
+logger = logging.getLogger(__name__)
+
+
+class StatusError(Exception):
+    """Raised when a server doesn't respond or responds with something that isn't a status."""
+    pass
+
+
+@dataclass
+class ServerStatus:
+    online: bool
+    fetched_at: float = field(default_factory=time.monotonic)
+    version: str = None
+    motd: str = None
+    players_online: int = 0
+    players_max: int = 0
+    # The status ping only includes a sample of players on big servers; RCON fills in the rest
+    players: list[str] = field(default_factory=list)
+    latency_ms: int = None
+
+    def fresh(self) -> bool:
+        return time.monotonic() - self.fetched_at < STATUS_TTL
+
+
+def parse_address(address: str, default_port: int = DEFAULT_PORT) -> tuple[str, int]:
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        return address, default_port
+    return host, int(port)
+
+
+def _varint(value: int) -> bytes:
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+async def _read_varint(reader: asyncio.StreamReader) -> int:
+    value = 0
+    for i in range(5):
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << 7 * i
+        if not byte & 0x80:
+            return value - (1 << 32) if value & (1 << 31) else value
+    raise StatusError('VarInt too long')
+
+
+def _packet(packet_id: int, payload: bytes = b'') -> bytes:
+    data = _varint(packet_id) + payload
+    return _varint(len(data)) + data
+
+
+def _string(value: str) -> bytes:
+    encoded = value.encode()
+    return _varint(len(encoded)) + encoded
+
+
+def _text(component) -> str:
+    """Flattens a chat component (as used for the MOTD) into plain text."""
+    if isinstance(component, str):
+        return re.sub('§.', '', component)
+    if isinstance(component, list):
+        return ''.join(_text(c) for c in component)
+    return _text(component.get('text', '')) + ''.join(_text(c) for c in component.get('extra', []))
+
+
+async def _status_exchange(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, port: int
+) -> tuple[dict, int]:
+    handshake = _varint(PROTOCOL_VERSION) + _string(host) + struct.pack('>H', port) + _varint(1)
+    writer.write(_packet(0x00, handshake) + _packet(0x00))
+    await writer.drain()
+    await _read_varint(reader)  # packet length
+    if await _read_varint(reader) != 0x00:
+        raise StatusError('Unexpected packet')
+    data = json.loads(await reader.readexactly(await _read_varint(reader)))
+
+    sent_at = time.monotonic()
+    writer.write(_packet(0x01, struct.pack('>q', int(sent_at))))
+    await writer.drain()
+    await _read_varint(reader)
+    await reader.readexactly(9)  # packet id and echoed payload
+    return data, round((time.monotonic() - sent_at) * 1000)
+
+
+async def ping_server(host: str, port: int = DEFAULT_PORT) -> ServerStatus:
+    """Asks a server for its status using the Server List Ping protocol (Minecraft 1.7+)."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), TIMEOUT)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise StatusError(f'Unable to connect to {host}:{port}') from e
+    try:
+        data, latency_ms = await asyncio.wait_for(_status_exchange(reader, writer, host, port), TIMEOUT)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, KeyError) as e:
+        raise StatusError(f'Bad status response from {host}:{port}') from e
+    finally:
+        writer.close()
+
+    players = data.get('players', {})
+    return ServerStatus(
+        online=True,
+        version=data.get('version', {}).get('name'),
+        motd=_text(data.get('description', '')).strip(),
+        players_online=players.get('online', 0),
+        players_max=players.get('max', 0),
+        players=sorted(p['name'] for p in players.get('sample', [])),
+        latency_ms=latency_ms,
+    )
+
+
+def _rcon_packet(request_id: int, packet_type: int, payload: str = '') -> bytes:
+    data = struct.pack('<ii', request_id, packet_type) + payload.encode() + b'\x00\x00'
+    return struct.pack('<i', len(data)) + data
+
+
+async def _read_rcon_packet(reader: asyncio.StreamReader) -> tuple[int, int, str]:
+    length, = struct.unpack('<i', await reader.readexactly(4))
+    data = await reader.readexactly(length)
+    request_id, packet_type = struct.unpack('<ii', data[:8])
+    return request_id, packet_type, data[8:-2].decode(errors='replace')
+
+
+async def _rcon_exchange(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter, password: str, command: str
+) -> str | None:
+    """Logs in and runs a command, returning its response, or None if the password was refused."""
+    writer.write(_rcon_packet(1, RCON_LOGIN, password))
+    await writer.drain()
+    request_id, _, _ = await _read_rcon_packet(reader)
+    if request_id == -1:
+        return None
+    # Long responses are split over several packets with nothing marking the last one, so follow the command with an
+    # invalid request; the server answers it only after the command's response is complete
+    writer.write(_rcon_packet(2, RCON_COMMAND, command) + _rcon_packet(3, RCON_RESPONSE))
+    await writer.drain()
+    response = []
+    while True:
+        request_id, _, payload = await _read_rcon_packet(reader)
+        if request_id != 2:
+            return ''.join(response)
+        response.append(payload)
+
+
+async def rcon_command(address: str, password: str, command: str) -> str:
+    """Runs a command over RCON and returns the server's response.
+
+    mcrcon can't be used here, as it sets up its timeout with a signal handler, which only works on the main thread.
+    """
+    host, port = parse_address(address, RCON_PORT)
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), TIMEOUT)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise StatusError(f'Unable to connect to RCON at {host}:{port}') from e
+    try:
+        response = await asyncio.wait_for(_rcon_exchange(reader, writer, password, command), TIMEOUT)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, struct.error) as e:
+        raise StatusError(f'Bad RCON response from {host}:{port}') from e
+    finally:
+        writer.close()
+    if response is None:
+        raise StatusError(f'RCON login refused by {host}:{port}')
+    return response
+
+
+async def rcon_list(address: str, password: str) -> list[str]:
+    """Returns the names of every player online, using the RCON `list` command."""
+    res = await rcon_command(address, password, 'list')
+    match = LIST_REGEX.match(res)
+    if not match:
+        raise StatusError(f'Unexpected list response: {res}')
+    return sorted(name.strip() for name in match.group(3).split(',') if name.strip())
+
+
+class StatusCache:
+    """Caches one server's status, making sure concurrent requests share a single round-trip."""
+    def __init__(self, address: str, rcon_address: str = None, rcon_pass: str = None):
+        self.host, self.port = parse_address(address)
+        self.rcon_address = rcon_address
+        self.rcon_pass = rcon_pass
+        self.status: ServerStatus = None
+        self._refreshing: asyncio.Task = None
+
+    async def get(self) -> ServerStatus:
+        if self.status and self.status.fresh():
+            return self.status
+        return await self.refresh()
+
+    async def refresh(self) -> ServerStatus:
+        if not self._refreshing or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._fetch())
+        # Shielded so a cancelled command doesn't cancel the fetch for everyone else waiting on it
+        return await asyncio.shield(self._refreshing)
+
+    async def _fetch(self) -> ServerStatus:
+        try:
+            status = await ping_server(self.host, self.port)
+        except StatusError:
+            status = ServerStatus(online=False)
+        if status.online and self.rcon_address and len(status.players) < status.players_online:
+            try:
+                status.players = await rcon_list(self.rcon_address, self.rcon_pass)
+            except StatusError as e:
+                # The sample is better than nothing
+                logger.warning(f'Unable to list players on {self.rcon_address}: {e}')
+        self.status = status
+        return status
@@ -0,0 +1,52 @@
+import logging
+import os
+from collections.abc import Iterable
+
+import discord
+
+
+# 'full' keeps every member of every guild in memory (discord.py's default).
+# 'minimal' only keeps the bot's own member objects and fetches member lists on demand.
+MEMBER_CACHE_MODE = os.getenv('SAKUYA_MEMBER_CACHE', 'full').lower()
+# Rough size of a cached discord.Member including its User, measured with tracemalloc
+APPROX_MEMBER_BYTES = 600
+
+logger = logging.getLogger(__name__)
+
+
+def minimal_cache() -> bool:
+    return MEMBER_CACHE_MODE == 'minimal'
+
+
+def member_cache_flags() -> discord.MemberCacheFlags | None:
+    if minimal_cache():
+        # Join events and command authors come with their member data attached, so no cache is needed for them
+        return discord.MemberCacheFlags.none()
+    # Let discord.py derive the flags from the bot's intents, as it does by default
+    return None
+
+
+async def guild_members(guild: discord.Guild) -> list[discord.Member]:
+    """Returns every member of a guild, requesting the member list from Discord if it isn't cached.
+
+    In minimal cache mode the fetched members are handed to the caller and then discarded.
+    """
+    if guild.chunked:
+        return list(guild.members)
+    logger.info(f'Requesting member list for {guild.name} ({guild.member_count} members).')
+    return await guild.chunk(cache=not minimal_cache())
+
+
+def report_cache_savings(guilds: Iterable[discord.Guild]):
+    if not minimal_cache():
+        logger.info('Member cache: full.')
+        return
+    uncached = {g: (g.member_count or 0) - len(g.members) for g in guilds}
+    total = sum(uncached.values())
+    logger.info(
+        f'Member cache: minimal. Not caching {total} members across {len(uncached)} guilds '
+        f'(~{total * APPROX_MEMBER_BYTES / 1024**2:.1f} MiB saved).'
+    )
+    for g, count in sorted(uncached.items(), key=lambda i: i[1], reverse=True)[:5]:
+        if count >= 1000:
+            logger.info(f'  {g.name}: ~{count * APPROX_MEMBER_BYTES / 1024**2:.1f} MiB ({count} members)')
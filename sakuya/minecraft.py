@@ -1,14 +1,16 @@
+import asyncio
 from dataclasses import dataclass
 import logging
 import random
 from typing import Dict
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from mcrcon import MCRcon, MCRconException
 from sqlalchemy import select
 
 from .db import Session, Guild, Member
+from .mcstatus import STATUS_TTL, TIMEOUT, StatusCache
 
 
 TRUST_MESSAGES = [
@@ -24,6 +26,9 @@ TRUST_MESSAGES = [
     "Please respect the staff."
 ]
 
+# Refresh a little before cached statuses go stale, so commands are always answered from the cache
+REFRESH_INTERVAL = STATUS_TTL - TIMEOUT
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,6 +38,7 @@ class GuildState:
     channel: discord.TextChannel
     rcon_address: str
     rcon_pass: str
+    status: StatusCache
 
 
 class Minecraft(commands.Cog):
@@ -41,12 +47,21 @@ class Minecraft(commands.Cog):
         self.guilds: Dict[discord.Guild, GuildState] = dict()
         self.data_loaded = False
 
+    async def cog_load(self):
+        # on_ready won't fire again when the extension is reloaded into a running bot
+        if self.bot.is_ready():
+            await self.on_ready()
+
+    async def cog_unload(self):
+        self.refresh_statuses.cancel()
+
     @commands.Cog.listener()
     async def on_ready(self):
         # This event fires on reconnects, but we only want it to run once
         if not self.data_loaded:
             self.data_loaded = True
             await self.load_from_db()
+            self.refresh_statuses.start()
             logger.info('Minecraft configuration loaded.')
 
     async def load_from_db(self):
@@ -69,9 +84,57 @@ class Minecraft(commands.Cog):
                 guild=guild,
                 channel=channel,
                 rcon_address=g.minecraft_rcon_address,
-                rcon_pass=g.minecraft_rcon_pass
+                rcon_pass=g.minecraft_rcon_pass,
+                status=StatusCache(
+                    g.minecraft_server_address or g.minecraft_rcon_address,
+                    rcon_address=g.minecraft_rcon_address,
+                    rcon_pass=g.minecraft_rcon_pass
+                )
             )
 
+    @tasks.loop(seconds=REFRESH_INTERVAL)
+    async def refresh_statuses(self):
+        # One slow server shouldn't hold up the others, and one failing shouldn't stop the loop for all of them
+        states = list(self.guilds.values())
+        results = await asyncio.gather(*(state.status.refresh() for state in states), return_exceptions=True)
+        for state, result in zip(states, results):
+            if isinstance(result, Exception):
+                logger.error(f'Unable to refresh the server status for {state.guild.name}: {result}')
+
+    @commands.command()
+    async def status(self, ctx):
+        state = self.guilds.get(ctx.guild)
+        if not state or ctx.channel != state.channel:
+            return
+        status = await state.status.get()
+        if not status.online:
+            await ctx.send("The server isn't answering at the moment. I'll keep an eye on it.")
+            return
+        msg = 'The server is up'
+        if status.version:
+            msg += f' and running {status.version}'
+        msg += f', with {status.players_online}/{status.players_max} players online ({status.latency_ms} ms).'
+        if status.motd:
+            msg += f'\n> {status.motd}'
+        await ctx.send(msg)
+
+    @commands.command()
+    async def online(self, ctx):
+        state = self.guilds.get(ctx.guild)
+        if not state or ctx.channel != state.channel:
+            return
+        status = await state.status.get()
+        if not status.online:
+            await ctx.send("The server isn't answering at the moment, so I couldn't say.")
+        elif not status.players_online:
+            await ctx.send('Nobody is online right now.')
+        else:
+            names = ', '.join(discord.utils.escape_markdown(name) for name in status.players)
+            hidden = status.players_online - len(status.players)
+            if hidden > 0:
+                names += f' and {hidden} more' if names else f'{hidden} players I can\'t see'
+            await ctx.send(f'Online now ({status.players_online}/{status.players_max}): {names}')
+
     @commands.command()
     async def whitelist(self, ctx, username):
         state = self.guilds.get(ctx.guild)
@@ -0,0 +1,103 @@
+"""Bulk removal of the accounts Sentinel flagged during a raid."""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import discord
+
+from . import join_log
+
+
+ACTIONS = {'ban': 'Banned', 'kick': 'Kicked'}
+# discord.py waits out rate limits on its own, so this only needs to be high enough to keep the bucket busy
+PURGE_CONCURRENCY = 5
+PROGRESS_INTERVAL = 3  # seconds between progress updates
+BAN_DELETE_MESSAGE_SECONDS = 60 * 60 * 24  # raiders' spam goes with them
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_targets(guild: discord.Guild, since: datetime) -> list[int]:
+    """Returns the flagged accounts that joined since the given time, leaving out any purged by an earlier run."""
+    return [
+        user_id for user_id in await join_log.unpurged_flagged_since(guild.id, since)
+        if user_id not in (guild.owner_id, guild.me.id)
+    ]
+
+
+@dataclass
+class PurgeJob:
+    guild: discord.Guild
+    channel: discord.TextChannel
+    action: str
+    since: datetime
+    moderator: str
+    user_ids: list[int] = field(default_factory=list)
+    done: int = 0
+    failed: int = 0
+    stopped: bool = False
+    # Purged but not yet marked as such in the join log
+    _purged: list[int] = field(default_factory=list)
+
+    def progress(self) -> str:
+        msg = f'{ACTIONS[self.action]} {self.done}/{len(self.user_ids)} flagged accounts'
+        if self.failed:
+            msg += f' ({self.failed} failed)'
+        return msg
+
+    async def _purge(self, queue: asyncio.Queue):
+        reason = f'Raid purge by {self.moderator}'
+        while not queue.empty() and not self.stopped:
+            user = discord.Object(queue.get_nowait())
+            try:
+                if self.action == 'ban':
+                    await self.guild.ban(user, reason=reason, delete_message_seconds=BAN_DELETE_MESSAGE_SECONDS)
+                else:
+                    await self.guild.kick(user, reason=reason)
+            except discord.NotFound:
+                # Already left or deleted their account, which is just as good for a kick
+                if self.action == 'ban':
+                    self.failed += 1
+                    continue
+            except discord.HTTPException as e:
+                # Including Forbidden, for members whose top role is above the bot's; the rest can still be purged
+                logger.warning(f'Unable to {self.action} {user.id} in {self.guild.name}: {e}')
+                self.failed += 1
+                continue
+            self.done += 1
+            self._purged.append(user.id)
+
+    async def _save_progress(self):
+        purged, self._purged = self._purged, []
+        if purged:
+            await join_log.mark_purged(self.guild.id, purged, datetime.now(timezone.utc))
+
+    async def run(self):
+        if not getattr(self.guild.me.guild_permissions, f'{self.action}_members'):
+            await self.channel.send(f"I'm not allowed to {self.action} members here.")
+            return
+        # Anyone already purged by an earlier, interrupted run is left out, so this doubles as resuming
+        self.user_ids = await purge_targets(self.guild, self.since)
+        if not self.user_ids:
+            await self.channel.send(f'There are no flagged accounts left to {self.action}.')
+            return
+        message = await self.channel.send(f'{self.progress()}...')
+        queue = asyncio.Queue()
+        for user_id in self.user_ids:
+            queue.put_nowait(user_id)
+        purgers = asyncio.gather(*(self._purge(queue) for _ in range(PURGE_CONCURRENCY)))
+        while not purgers.done():
+            await asyncio.wait([purgers], timeout=PROGRESS_INTERVAL)
+            await self._save_progress()
+            if not purgers.done():
+                await message.edit(content=f'{self.progress()}...')
+        purgers.result()
+        msg = f'{self.progress()}.'
+        if self.stopped:
+            msg += ' Stopped before finishing.'
+        await message.edit(content=msg)
+
+    def stop(self):
+        """Stops the purge once the requests already underway are done, and their progress is saved."""
+        self.stopped = True
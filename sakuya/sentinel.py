@@ -1,13 +1,18 @@
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 import logging
 from typing import Dict
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from sqlalchemy import select
 
+from . import join_log, snapshot, workers
 from .db import Session, Guild
+from .join_clusters import JoinCluster, JoinClusterDetector, Joiner
+from .members import guild_members
+from .purge import ACTIONS as PURGE_ACTIONS, PurgeJob, purge_targets
 
 
 SUSPICIOUS_ACCOUNT_AGE_LIMIT_DAYS = 7
@@ -16,28 +21,115 @@ ALERT_RESET_MINUTES = 15
 logger = logging.getLogger(__name__)
 
 
+def _worker_add_join(guild_id: int, joiner: Joiner, now: datetime) -> JoinCluster | None:
+    return workers.local('join_clusters', guild_id, JoinClusterDetector).add(joiner, now)
+
+
+def _worker_dump_joins(guild_id: int) -> list[dict]:
+    return workers.local('join_clusters', guild_id, JoinClusterDetector).dump()
+
+
+def _worker_load_joins(guild_id: int, joins: list[dict]):
+    workers.discard('join_clusters', guild_id)
+    workers.local('join_clusters', guild_id, lambda: JoinClusterDetector.load(joins))
+
+
 @dataclass
 class GuildState:
     guild: discord.Guild
     alert_channel: discord.TextChannel
     last_alert: datetime = None
     recent_alerts: int = 0
+    purge: PurgeJob = None
+    purge_task: asyncio.Task = None
+
+    def purging(self) -> bool:
+        return self.purge_task is not None and not self.purge_task.done()
 
 
 class Sentinel(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.guilds: Dict[discord.Guild, GuildState] = dict()
+        self.join_log = join_log.JoinLogBuffer()
         self.data_loaded = False
 
+    async def cog_load(self):
+        # on_ready won't fire again when the extension is reloaded into a running bot
+        if self.bot.is_ready():
+            await self.on_ready()
+
+    async def cog_unload(self):
+        # Let a flush that's underway finish rather than losing its joins
+        self.flush_join_log.stop()
+        self.expire_join_log.cancel()
+        await self.join_log.flush()
+        purging = {guild for guild, state in self.guilds.items() if state.purging()}
+        for guild in purging:
+            # Stopping makes the purge record its progress, so it can resume without redoing anything
+            self.guilds[guild].purge.stop()
+        await asyncio.gather(*(self.guilds[guild].purge_task for guild in purging), return_exceptions=True)
+        if not self.data_loaded:
+            # Don't replace a snapshot that hasn't been restored yet with an empty one
+            return
+        # Recent joins are kept too, so a raid that's underway is still recognised as one after a restart
+        windows = dict(zip(self.guilds, await asyncio.gather(
+            *(workers.pool.run(guild.id, _worker_dump_joins, guild.id) for guild in self.guilds)
+        )))
+        snapshot.save('sentinel', {
+            str(guild.id): {
+                'alert_channel': state.alert_channel.id,
+                'last_alert': snapshot.dump_datetime(state.last_alert),
+                'recent_alerts': state.recent_alerts,
+                'purge': {
+                    'channel': state.purge.channel.id,
+                    'action': state.purge.action,
+                    'since': snapshot.dump_datetime(state.purge.since),
+                    'moderator': state.purge.moderator,
+                } if guild in purging else None,
+                'joins': windows[guild],
+            } for guild, state in self.guilds.items() if state.last_alert or guild in purging or windows[guild]
+        })
+
     @commands.Cog.listener()
     async def on_ready(self):
         # This event fires on reconnects, but we only want it to run once
         if not self.data_loaded:
             self.data_loaded = True
             await self.load_from_db()
+            await self.restore_snapshot()
+            self.flush_join_log.start()
+            self.expire_join_log.start()
             logger.info('Sentinel ready.')
 
+    @tasks.loop(seconds=join_log.FLUSH_INTERVAL)
+    async def flush_join_log(self):
+        await self.join_log.flush()
+
+    @tasks.loop(hours=1)
+    async def expire_join_log(self):
+        if deleted := await join_log.expire(datetime.now(timezone.utc)):
+            logger.info(f'Removed {deleted} joins older than {join_log.RETENTION.days} days from the join log.')
+
+    async def restore_snapshot(self):
+        saved = snapshot.load('sentinel')
+        for guild, state in self.guilds.items():
+            saved_state = saved.get(str(guild.id))
+            # Alert counts only carry over if the guild's configuration hasn't changed in the meantime
+            if saved_state and saved_state['alert_channel'] == state.alert_channel.id:
+                state.last_alert = snapshot.load_datetime(saved_state['last_alert'])
+                state.recent_alerts = saved_state['recent_alerts']
+                if saved_state.get('joins'):
+                    await workers.pool.run(guild.id, _worker_load_joins, guild.id, saved_state['joins'])
+            if saved_state and saved_state.get('purge'):
+                saved_purge = saved_state['purge']
+                channel = guild.get_channel_or_thread(saved_purge['channel'])
+                if channel:
+                    self.start_purge(state, PurgeJob(
+                        guild=guild, channel=channel, action=saved_purge['action'],
+                        since=snapshot.load_datetime(saved_purge['since']), moderator=saved_purge['moderator']
+                    ))
+
     async def load_from_db(self):
         async with Session() as session:
             query = select(Guild).where(Guild.sentinel_channel_id.isnot(None))
@@ -64,8 +156,11 @@ class Sentinel(commands.Cog):
             return
         now = datetime.now(timezone.utc)
         account_age = now - member.created_at
+        cluster = await workers.pool.run(member.guild.id, _worker_add_join, member.guild.id, Joiner.of(member), now)
+        flagged = account_age.days < SUSPICIOUS_ACCOUNT_AGE_LIMIT_DAYS or cluster is not None
+        self.join_log.add(member, now, flagged)
         # Update state
-        if account_age.days >= SUSPICIOUS_ACCOUNT_AGE_LIMIT_DAYS:
+        if not flagged:
             return
         if state.last_alert and now - state.last_alert > timedelta(minutes=ALERT_RESET_MINUTES):
             # It's been quiet for a while, reset counter
@@ -82,6 +177,8 @@ class Sentinel(commands.Cog):
         minutes = account_age.seconds // 60 % 60
         age_string = f'{days}d {hours}h {minutes}m'
         msg = f'Suspicious user {member.mention} joined the server (account age: {age_string}).'
+        if cluster:
+            msg += f'\nThey look like part of a group: {cluster.describe()}.'
         if state.recent_alerts == 3:
             msg += '\nI believe we are being raided. I will silence further alerts until things have been '
             msg += f'calm for {ALERT_RESET_MINUTES} minutes.'
@@ -92,12 +189,129 @@ class Sentinel(commands.Cog):
                 f'Missing permissions for alert channel in {state.guild.name}! Alert not delivered.'
             )
 
+    @commands.command()
+    @commands.has_guild_permissions(ban_members=True)
+    async def scan(self, ctx, hours: int = 24):
+        """Retroactively lists suspicious accounts that joined within the last few hours."""
+        if ctx.guild not in self.guilds:
+            return
+        now = datetime.now(timezone.utc)
+        async with ctx.typing():
+            members = await guild_members(ctx.guild)
+        suspicious = sorted(
+            (m for m in members
+             if m.joined_at and now - m.joined_at < timedelta(hours=hours)
+             and (now - m.created_at).days < SUSPICIOUS_ACCOUNT_AGE_LIMIT_DAYS),
+            key=lambda m: m.joined_at
+        )
+        if not suspicious:
+            await ctx.send(f'No suspicious accounts joined in the last {hours} hours.')
+            return
+        msg = f'{len(suspicious)} suspicious accounts joined in the last {hours} hours:'
+        for m in suspicious:
+            line = f'\n{m.mention} (joined {discord.utils.format_dt(m.joined_at, "R")})'
+            if len(msg) + len(line) > 1900:
+                msg += '\n...'
+                break
+            msg += line
+        await ctx.send(msg)
+
+    @commands.command()
+    @commands.has_guild_permissions(ban_members=True)
+    async def joins(self, ctx, since_keyword: str, *, since: str):
+        """Lists everyone who joined since a given time, e.g. "Maid, joins since 2h" or "Maid, joins since 14:30"."""
+        if ctx.guild not in self.guilds or since_keyword.lower() != 'since':
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            since = join_log.parse_since(since, now)
+        except ValueError:
+            await ctx.send('Since when? Try something like "2h", "14:30" or "2024-01-31 14:30" (UTC).')
+            return
+        # Joins waiting in the buffer should show up too
+        await self.join_log.flush()
+        joins = await join_log.joins_since(ctx.guild.id, since)
+        if not joins:
+            await ctx.send(f'Nobody joined since {discord.utils.format_dt(since)}.')
+            return
+        flagged = sum(j.flagged for j in joins)
+        more = '+' if len(joins) == join_log.QUERY_LIMIT else ''
+        msg = f'{len(joins)}{more} joins since {discord.utils.format_dt(since)}, {flagged} of them flagged:'
+        # Flagged joins go first so they aren't the ones cut off on large raids
+        for j in sorted(joins, key=lambda j: not j.flagged):
+            account_age = j.joined_at - j.created_at
+            line = f'\n{"⚠️ " if j.flagged else ""}<@{j.user_id}> joined '
+            line += f'{discord.utils.format_dt(j.joined_at, "T")}'
+            line += f', account age {account_age.days}d {account_age.seconds // 3600}h'
+            if len(msg) + len(line) > 1900:
+                msg += '\n...'
+                break
+            msg += line
+        await ctx.send(msg)
+
+    @commands.command()
+    @commands.has_guild_permissions(ban_members=True)
+    async def purge(self, ctx, target: str, action: str, since_keyword: str = None, *, since: str = None):
+        """Bans or kicks every flagged account that joined since a given time, e.g. "Maid, purge raid ban since 2h".
+
+        "preview" instead of an action lists who would be affected, and "stop" stops a purge that's underway.
+        """
+        state = self.guilds.get(ctx.guild)
+        if not state or target.lower() != 'raid':
+            return
+        action = action.lower()
+        if action == 'stop':
+            if not state.purging():
+                await ctx.send("There's no purge underway.")
+                return
+            state.purge.stop()
+            await asyncio.wait([state.purge_task])
+            await ctx.send('Stopped. Run the same purge again to finish the job.')
+            return
+        if action not in (*PURGE_ACTIONS, 'preview') or not since or since_keyword.lower() != 'since':
+            await ctx.send('Purge how? Try "Maid, purge raid ban since 2h", or "preview" to see who would be affected.')
+            return
+        try:
+            since = join_log.parse_since(since, datetime.now(timezone.utc))
+        except ValueError:
+            await ctx.send('Since when? Try something like "2h", "14:30" or "2024-01-31 14:30" (UTC).')
+            return
+        # Joins waiting in the buffer should be included
+        await self.join_log.flush()
+
+        if action == 'preview':
+            user_ids = await purge_targets(ctx.guild, since)
+            if not user_ids:
+                await ctx.send(f'No flagged accounts joined since {discord.utils.format_dt(since)}.')
+                return
+            msg = f'This would remove {len(user_ids)} flagged accounts that joined since '
+            msg += f'{discord.utils.format_dt(since)}:'
+            for user_id in user_ids:
+                line = f'\n<@{user_id}>'
+                if len(msg) + len(line) > 1900:
+                    msg += '\n...'
+                    break
+                msg += line
+            await ctx.send(msg)
+            return
+        if state.purging():
+            await ctx.send('A purge is already underway. "Maid, purge raid stop" stops it.')
+            return
+        self.start_purge(state, PurgeJob(
+            guild=ctx.guild, channel=ctx.channel, action=action, since=since, moderator=str(ctx.author)
+        ))
+
+    def start_purge(self, state: GuildState, job: PurgeJob):
+        state.purge = job
+        state.purge_task = asyncio.create_task(job.run())
+
     async def enable(self, ctx, alert_channel: discord.TextChannel = None):
         channel = alert_channel or ctx.channel
         if not channel.permissions_for(ctx.me).send_messages:
             await ctx.send("I don't have permission to send messages in that channel.")
             return
         self.guilds[ctx.guild] = GuildState(guild=ctx.guild, alert_channel=channel)
+        await workers.pool.run(ctx.guild.id, workers.discard, 'join_clusters', ctx.guild.id)
         async with Session.begin() as session:
             g = await session.get(Guild, ctx.guild.id) or Guild(id=ctx.guild.id)
             g.sentinel_channel_id = channel.id
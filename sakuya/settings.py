@@ -1,6 +1,8 @@
 import discord
 from discord.ext import commands
 
+from .wordle.data import DEFAULT_WORD_LENGTH
+
 
 class Settings(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -18,8 +20,18 @@ class Settings(commands.Cog):
 
     @enable.command(name='wordle')
     @commands.has_guild_permissions(ban_members=True)
-    async def enable_wordle(self, ctx):
-        await self.bot.get_cog('Wordle').enable(ctx)
+    async def enable_wordle(self, ctx, word_length: int = DEFAULT_WORD_LENGTH):
+        await self.bot.get_cog('Wordle').enable(ctx, word_length)
+
+    @enable.command(name='board')
+    @commands.has_guild_permissions(ban_members=True)
+    async def enable_board(self, ctx):
+        await self.bot.get_cog('Wordle').set_board_mode(ctx, True)
+
+    @enable.command(name='hardmode')
+    @commands.has_guild_permissions(ban_members=True)
+    async def enable_hard_mode(self, ctx):
+        await self.bot.get_cog('Wordle').set_hard_mode(ctx, True)
 
     @commands.group()
     async def disable(self, ctx):
@@ -36,6 +48,16 @@ class Settings(commands.Cog):
     async def disable_wordle(self, ctx):
         await self.bot.get_cog('Wordle').disable(ctx)
 
+    @disable.command(name='board')
+    @commands.has_guild_permissions(ban_members=True)
+    async def disable_board(self, ctx):
+        await self.bot.get_cog('Wordle').set_board_mode(ctx, False)
+
+    @disable.command(name='hardmode')
+    @commands.has_guild_permissions(ban_members=True)
+    async def disable_hard_mode(self, ctx):
+        await self.bot.get_cog('Wordle').set_hard_mode(ctx, False)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Settings(bot))
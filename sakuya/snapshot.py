@@ -0,0 +1,55 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+# Cogs write their in-memory state here when unloaded, so restarts and reloads can pick up where they left off
+SNAPSHOT_DIR = Path(os.getenv('SAKUYA_SNAPSHOT_DIR', 'snapshots'))
+# Older snapshots are most likely left over from a crash or a long downtime, and no longer worth restoring
+SNAPSHOT_MAX_AGE = timedelta(minutes=30)
+
+logger = logging.getLogger(__name__)
+
+
+def save(name: str, state: dict):
+    SNAPSHOT_DIR.mkdir(exist_ok=True)
+    path = SNAPSHOT_DIR / f'{name}.json'
+    tmp_path = path.with_suffix('.tmp')
+    data = {'saved_at': datetime.now(timezone.utc).isoformat(), 'state': state}
+    with tmp_path.open('w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    # Replace in one go so a crash mid-write can't leave a corrupt snapshot behind
+    tmp_path.replace(path)
+    logger.info(f'Saved {name} snapshot.')
+
+
+def load(name: str) -> dict:
+    """Returns the state saved under `name`, or an empty dict if there is no recent snapshot.
+
+    Snapshots are deleted once read, so they're never restored twice.
+    """
+    path = SNAPSHOT_DIR / f'{name}.json'
+    try:
+        with path.open('r') as f:
+            data = json.load(f)
+        path.unlink()
+    except FileNotFoundError:
+        return dict()
+    except (OSError, ValueError) as e:
+        logger.warning(f'Unable to read {name} snapshot: {e}')
+        return dict()
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(data['saved_at'])
+    if age > SNAPSHOT_MAX_AGE:
+        logger.info(f'Ignoring {name} snapshot from {age} ago.')
+        return dict()
+    return data['state']
+
+
+def dump_datetime(dt: datetime | None) -> str | None:
+    return dt.isoformat() if dt else None
+
+
+def load_datetime(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
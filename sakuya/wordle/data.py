@@ -1,11 +1,65 @@
+import gzip
+import math
+from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
 
 
-with Path(__file__).with_name('word_list.txt').open('r') as f:
-    WORD_LIST = f.read().splitlines()
+WORD_LENGTHS = range(4, 8)
+DEFAULT_WORD_LENGTH = 5
 
-with Path(__file__).with_name('valid_guesses.txt').open('r') as f:
-    VALID_GUESSES = set(f.read().splitlines()) | set(WORD_LIST)
 
 with Path(__file__).with_name('letter_emotes.txt').open('r') as f:
     LETTER_EMOTES = f.read().splitlines()
+
+# English words from most to least common, from wordninja's language model.
+# Costs follow Zipf's law, so splitting a word in two only pays off for rare compounds.
+with gzip.open(Path(__file__).with_name('word_frequencies.txt.gz'), 'rt') as f:
+    _words = f.read().split()
+    WORD_COSTS = {word: math.log((rank + 1) * math.log(len(_words))) for rank, word in enumerate(_words)}
+    del _words
+
+
+@dataclass(frozen=True)
+class WordData:
+    length: int
+    # Possible solutions
+    word_list: list[str]
+    # Everything that's accepted as a guess, solutions included
+    valid_guesses: frozenset[str]
+    # Every start of a valid guess, including the empty string and the full words
+    prefixes: frozenset[str]
+    # Valid guesses from most to least common. Unlisted words are treated as the most obscure.
+    ranks: dict[str, int]
+    # Costs of the words compounds are split into: parts of valid guesses and their plurals, and words up to twice as
+    # long that contain a valid guess, so a guess isn't cut out of those when they're meant as a whole
+    segment_costs: dict[str, float]
+
+    def rank(self, word: str) -> int:
+        return self.ranks.get(word, len(self.ranks))
+
+
+@cache
+def word_data(length: int = DEFAULT_WORD_LENGTH) -> WordData:
+    """Loads the word lists for a word length. Each length is only loaded once some guild plays with it."""
+    if length not in WORD_LENGTHS:
+        raise ValueError(f'Unsupported word length: {length}')
+    with Path(__file__).with_name(f'word_list_{length}.txt').open('r') as f:
+        word_list = f.read().splitlines()
+    with Path(__file__).with_name(f'valid_guesses_{length}.txt').open('r') as f:
+        valid_guesses = frozenset(f.read().splitlines()) | frozenset(word_list)
+    ranked = sorted(valid_guesses & WORD_COSTS.keys(), key=WORD_COSTS.get)
+    pieces = {word[start:end] for word in valid_guesses for end in range(1, length + 1) for start in range(end)}
+    pieces |= {piece + 's' for piece in pieces}
+    pieces |= {
+        word for word in WORD_COSTS if length < len(word) <= 2 * length
+        and any(word[start:start + length] in valid_guesses for start in range(len(word) - length + 1))
+    }
+    return WordData(
+        length=length,
+        word_list=word_list,
+        valid_guesses=valid_guesses,
+        prefixes=frozenset(word[:i] for word in valid_guesses for i in range(length + 1)),
+        ranks={word: rank for rank, word in enumerate(ranked)},
+        segment_costs={word: WORD_COSTS[word] for word in pieces & WORD_COSTS.keys()},
+    )
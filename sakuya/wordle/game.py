@@ -1,18 +1,27 @@
+import asyncio
 import logging
 import os
 import random
 import string
+from collections import defaultdict
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import datetime, time, timedelta, timezone
 from typing import Dict
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from sqlalchemy import select
 
-from sakuya.db import Session, Guild
-from .data import WORD_LIST
-from .guess import GuessLengthError, InvalidGuessError, emojify_guess, parse_guess
+from sakuya import snapshot, workers
+from sakuya.db import Session, Guild, WordleChannel
+from .data import DEFAULT_WORD_LENGTH, WORD_LENGTHS, word_data
+from .guess import (
+    PARSE_CACHE, CacheInfo, Emote, EmoteIndex, GuessLengthError, InvalidGuessError, emojify_guess, parse_guess
+)
+from .hard_mode import HardModeConstraints
+from .schedule import WordSchedule, round_number
+from .suggest import suggest, suggestion_index
 
 
 FREE_PLAY = False  # no wait between rounds, multiple guesses per player
@@ -49,63 +58,231 @@ def time_until_next_game():
     return f'{absolute_time} ({relative_time})'
 
 
+def _worker_index_emotes(guild_id: int, word_lengths: set[int], emotes: list[Emote]):
+    indexes: dict[int, EmoteIndex] = workers.local('emotes', guild_id, dict)
+    for word_length in indexes.keys() - word_lengths:
+        del indexes[word_length]
+    for word_length in word_lengths:
+        # Load the word lists in the worker now rather than on the first guess
+        word_data(word_length)
+        suggestion_index(word_length)
+        indexes.setdefault(word_length, EmoteIndex(word_length)).update(emotes)
+
+
+def _worker_parse_guess(guild_id: int, guess: str, word_length: int) -> str:
+    """Parses a guess. Invalid guesses that look like typos come with the closest valid guesses as arguments."""
+    try:
+        return parse_guess(guess, word_length, workers.local('emotes', guild_id, dict).get(word_length))
+    except InvalidGuessError:
+        text = guess.lower()
+        if not (text.isascii() and text.isalpha()):
+            raise
+        raise InvalidGuessError(*suggest(text, word_length)) from None
+
+
+def _worker_parse_cache_info() -> CacheInfo:
+    return PARSE_CACHE.info()
+
+
+async def parse_cache_info() -> CacheInfo:
+    """Returns the parse cache statistics of every process that parses guesses, added up."""
+    return CacheInfo.total(await workers.pool.run_all(_worker_parse_cache_info))
+
+
 @dataclass
-class GuildState:
+class ChannelState:
     guild: discord.Guild
     channel: discord.TextChannel
     word: str = None
     game_start: datetime = None
     last_guess_at: datetime = datetime.utcfromtimestamp(0)
     guesses: list[str] = None
-    guessers: set[discord.Member] = None
+    guessers: set[int] = None
+    word_length: int = DEFAULT_WORD_LENGTH
+    # Board mode keeps a single message per round up to date instead of sending a new one for every guess
+    board_mode: bool = False
+    board_message: discord.Message = None
+    # Constraints are kept up to date either way, so hard mode can be switched on in the middle of a round
+    hard_mode: bool = False
+    constraints: HardModeConstraints = None
+    schedule: WordSchedule = None
+    # Extra rounds are played in the same time slot as the round before them, so they need their own place in the
+    # schedule; this many words are skipped ahead
+    extra_rounds: int = 0
+
+    @property
+    def max_guesses(self):
+        return self.word_length + 1
 
     def started(self):
         return self.word is not None and self.guesses is not None
 
     def finished(self):
-        return self.started() and len(self.guesses) == 6 or (len(self.guesses) and self.guesses[-1] == self.word)
+        return self.started() and len(self.guesses) == self.max_guesses or (
+            len(self.guesses) and self.guesses[-1] == self.word
+        )
 
 
 class Wordle(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.guilds: Dict[discord.Guild, GuildState] = dict()
+        # Keyed by channel id, since a guild can have games going in several channels
+        self.channels: Dict[int, ChannelState] = dict()
+        # Game channel ids by guild id, to find a guild's games without going through every channel
+        self.guild_channels: Dict[int, set[int]] = defaultdict(set)
+        # Guesses in a channel are handled one at a time, since parsing them can wait on a worker
+        self.guess_locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
         self.data_loaded = False
 
+    async def cog_load(self):
+        # on_ready won't fire again when the extension is reloaded into a running bot
+        if self.bot.is_ready():
+            await self.on_ready()
+
     @commands.Cog.listener()
     async def on_ready(self):
         # This event fires on reconnects, but we only want it to run once
         if not self.data_loaded:
             self.data_loaded = True
             await self.load_from_db()
+            self.restore_snapshot()
+            self.log_parse_cache.start()
             logger.info("Wordle module ready.")
 
+    @tasks.loop(hours=1)
+    async def log_parse_cache(self):
+        info = await parse_cache_info()
+        if info.hits or info.misses:
+            logger.info(f"Guess parse cache: {info}.")
+
+    def restore_snapshot(self):
+        saved = snapshot.load('wordle')
+        for channel_id, state in self.channels.items():
+            saved_state = saved.get(str(channel_id))
+            # Rounds only carry over if the channel's configuration hasn't changed in the meantime
+            if not saved_state or saved_state['word_length'] != state.word_length:
+                continue
+            state.word = saved_state['word']
+            state.game_start = snapshot.load_datetime(saved_state['game_start'])
+            state.guesses = saved_state['guesses']
+            state.guessers = set(saved_state['guessers'])
+            state.constraints = HardModeConstraints.from_guesses(state.guesses, state.word)
+            if saved_state['board_message'] and state.board_mode:
+                state.board_message = state.channel.get_partial_message(saved_state['board_message'])
+
     async def load_from_db(self):
         async with Session() as session:
-            query = select(Guild).where(Guild.wordle_channel_id.isnot(None))
-            guilds = (await session.scalars(query)).all()
-        for g in guilds:
-            guild = self.bot.get_guild(g.id)
+            # Every game channel of every guild in one go
+            configs = (await session.scalars(select(WordleChannel))).all()
+        for c in configs:
+            guild = self.bot.get_guild(c.guild_id)
             if not guild:
-                logger.warning(f"Guild {g.id} not found during Wordle init.")
+                logger.warning(f"Guild {c.guild_id} not found during Wordle init.")
                 continue
-            channel = guild.get_channel_or_thread(g.wordle_channel_id)
+            channel = guild.get_channel_or_thread(c.channel_id)
             if not channel:
-                logger.warning(f"Wordle channel doesn't exist in {guild.name}. Wordle disabled in guild.")
+                logger.warning(f"Wordle channel {c.channel_id} doesn't exist in {guild.name}. Wordle disabled there.")
                 continue
             if not channel.permissions_for(guild.me).send_messages:
-                logger.warning(f"Missing permissions for Wordle channel in {guild.name}. Wordle disabled in guild.")
+                logger.warning(f"Missing permissions for Wordle channel #{channel.name} in {guild.name}. Wordle disabled.")
                 continue
-            self.guilds[guild] = GuildState(guild=guild, channel=channel)
+            self.add_channel(ChannelState(
+                guild=guild, channel=channel, word_length=c.word_length, board_mode=c.board_mode, hard_mode=c.hard_mode,
+                extra_rounds=c.extra_rounds
+            ))
+        # Index every guild's emotes at once, so the workers can get on with it in parallel
+        guilds = {state.guild for state in self.channels.values()}
+        await asyncio.gather(*(self.index_emotes(guild, guild.emojis) for guild in guilds))
+
+    def add_channel(self, state: ChannelState):
+        self.channels[state.channel.id] = state
+        self.guild_channels[state.guild.id].add(state.channel.id)
+
+    def remove_channel(self, channel_id: int) -> ChannelState | None:
+        state = self.channels.pop(channel_id, None)
+        if state:
+            self.guild_channels[state.guild.id].discard(channel_id)
+            if not self.guild_channels[state.guild.id]:
+                del self.guild_channels[state.guild.id]
+        return state
+
+    async def index_emotes(self, guild: discord.Guild, emotes: Iterable[discord.Emoji]):
+        """Indexes a guild's emotes in the worker that parses its guesses, for each word length played in the guild."""
+        word_lengths = {self.channels[channel_id].word_length for channel_id in self.guild_channels.get(guild.id, ())}
+        emotes = [Emote(e.id, e.name) for e in emotes]
+        await workers.pool.run(guild.id, _worker_index_emotes, guild.id, word_lengths, emotes)
+
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild: discord.Guild, before, after):
+        if guild.id in self.guild_channels:
+            await self.index_emotes(guild, after)
 
-    def reset(self, guild: discord.Guild):
-        self.guilds[guild] = GuildState(guild=guild, channel=self.guilds[guild].channel)
+    def reset(self, channel_id: int):
+        old_state = self.channels[channel_id]
+        self.channels[channel_id] = ChannelState(
+            guild=old_state.guild, channel=old_state.channel, word_length=old_state.word_length,
+            board_mode=old_state.board_mode, hard_mode=old_state.hard_mode, schedule=old_state.schedule,
+            extra_rounds=old_state.extra_rounds
+        )
+
+    async def start_extra_round(self, channel_id: int):
+        """Makes the next guess start a new round with the next word, without waiting for the next time slot."""
+        self.reset(channel_id)
+        state = self.channels[channel_id]
+        state.extra_rounds += 1
+        async with Session.begin() as session:
+            c = await session.get(WordleChannel, channel_id)
+            c.extra_rounds = state.extra_rounds
+
+    async def cog_unload(self):
+        self.log_parse_cache.cancel()
+        if not self.data_loaded:
+            # Don't replace a snapshot that hasn't been restored yet with an empty one
+            return
+        snapshot.save('wordle', {
+            str(channel_id): {
+                'word_length': state.word_length,
+                'word': state.word,
+                'game_start': snapshot.dump_datetime(state.game_start),
+                'guesses': state.guesses,
+                'guessers': list(state.guessers),
+                'board_message': state.board_message and state.board_message.id,
+            } for channel_id, state in self.channels.items() if state.started()
+        })
+
+    async def update_board(self, state: ChannelState, content: str):
+        """Shows the current round in the board message.
+
+        Guesses are at least three seconds apart, so there are never enough edits in a row to be worth batching.
+        """
+        if state.board_message:
+            try:
+                await state.board_message.edit(content=content)
+                return
+            except discord.NotFound:
+                # Someone deleted the board; start a new one
+                pass
+        state.board_message = await state.channel.send(content)
+
+    async def reject(self, ctx: commands.Context, state: ChannelState, reason: str, reaction: str, explain=False):
+        """Turns down a guess. Board mode only reacts to keep the channel tidy, unless the reason needs `explain`ing."""
+        if state.board_mode and not explain:
+            await ctx.message.add_reaction(reaction)
+        else:
+            await ctx.send(reason)
 
     @commands.command()
     async def guess(self, ctx: commands.Context, *guess: str):
-        state = self.guilds.get(ctx.guild)
+        if ctx.channel.id not in self.channels:
+            return
+        # Otherwise simultaneous guesses would all pass the checks below before any of them is counted
+        async with self.guess_locks[ctx.channel.id]:
+            await self.handle_guess(ctx, guess)
+
+    async def handle_guess(self, ctx: commands.Context, guess: tuple[str, ...]):
+        state = self.channels.get(ctx.channel.id)
         overtime = False
-        if not (state and ctx.channel == state.channel) or (datetime.now() - state.last_guess_at).total_seconds() < 3:
+        if not state or (datetime.now() - state.last_guess_at).total_seconds() < 3:
             # Second condition prevents accidental simultaneous guesses by multiple players
             return
         if state.game_start != current_game_start():
@@ -113,121 +290,190 @@ class Wordle(commands.Cog):
                 overtime = True
             else:
                 # Start a new game
+                words = word_data(state.word_length)
+                state.game_start = current_game_start()
                 if os.getenv('SAKUYA_DEBUG'):
-                    state.word = 'debug'
+                    state.word = 'debug' if state.word_length == 5 else words.word_list[0]
                 else:
-                    state.word = random.choice(WORD_LIST)
-                state.game_start = current_game_start()
+                    if not state.schedule:
+                        state.schedule = WordSchedule(state.channel.id, words.word_list)
+                    state.word = state.schedule.word(
+                        round_number(state.game_start, GAME_TIMEDELTA) + state.extra_rounds
+                    )
                 state.guesses = []
                 state.guessers = set()
+                state.constraints = HardModeConstraints(state.word_length)
+                state.board_message = None
         if state.finished():
             await ctx.send(f"I'm preparing for the next game. Come back at {time_until_next_game()}!")
             return
-        if ctx.author in state.guessers and not (overtime or FREE_PLAY or os.getenv('SAKUYA_DEBUG')):
+        if ctx.author.id in state.guessers and not (overtime or FREE_PLAY or os.getenv('SAKUYA_DEBUG')):
             await ctx.send("It's more fun if everyone gets to guess. Please come play again later, though!")
             return
 
         # Guess parsing
-        if guess and len(guess[0]) == 5:
+        if guess and len(guess[0]) == state.word_length:
             # The first word has the right length for a guess; use that and ignore potential silly jokes after it
             guess = guess[0]
         else:
             # We're receiving the guess as a list to cover cases where Discord inserted spaces between emoji
             guess = ''.join(guess)
         try:
-            guess = parse_guess(guess)
+            guess = await workers.pool.run(ctx.guild.id, _worker_parse_guess, ctx.guild.id, guess, state.word_length)
         except GuessLengthError:
-            await ctx.send("Your guess must be 5 letters, a-z only.")
+            await self.reject(ctx, state, f"Your guess must be {state.word_length} letters, a-z only.", '📏')
             return
-        except InvalidGuessError:
-            await ctx.send(random.choice(INVALID_GUESS_RESPONSES))
+        except InvalidGuessError as e:
+            reason = random.choice(INVALID_GUESS_RESPONSES)
+            if suggestions := [f'**{s}**' for s in e.args]:
+                if len(suggestions) > 1:
+                    suggestions = [', '.join(suggestions[:-1]), suggestions[-1]]
+                options = ' or '.join(suggestions)
+                reason = f"I don't know that word. Did you mean {options}?"
+            await self.reject(ctx, state, reason, '❓', explain=bool(suggestions))
             return
         if guess in state.guesses:
-            await ctx.send("Someone already guessed that. Try again.")
+            await self.reject(ctx, state, "Someone already guessed that. Try again.", '🔁')
+            return
+        if state.hard_mode and (violation := state.constraints.violation(guess)):
+            await self.reject(ctx, state, f"We're playing on hard mode. {violation}", '🔒', explain=True)
             return
 
         # Finally done validating. Process the guess!
         state.guesses.append(guess)
-        state.guessers.add(ctx.author)
+        state.guessers.add(ctx.author.id)
+        state.constraints.update(guess, state.word)
         state.last_guess_at = datetime.now()
 
         if guess == state.word:
             game_state = 'won'
-        elif len(state.guesses) == 6:
+        elif len(state.guesses) == state.max_guesses:
             game_state = 'lost'
         else:
             game_state = 'playing'
 
         guess_count = len(state.guesses)
         guess_count_text = 'X' if game_state == 'lost' else str(guess_count)
-        msg = f"**Wordle** - {guess_count_text}/6\n"
-        msg += "\n".join(emojify_guess(g, state.word) for g in state.guesses)
-        msg += "\n\n"
+        board = f"**Wordle** - {guess_count_text}/{state.max_guesses}\n"
+        board += "\n".join(emojify_guess(g, state.word) for g in state.guesses)
+        remark = ""
         match game_state:
             case 'won':
-                msg += [
+                remark += [
                     "...wait, huh? You possess mysterious abilities.",
                     "Excellent! It seems luck is on your side today.",
                     "Well done!",
                     "Not bad.",
                     "You won!",
                     "I was worried I made it too difficult. Good job."
-                ][guess_count-1]
+                ][min(guess_count, 6) - 1]
                 if FREE_PLAY:
-                    msg += "\nI've got lots of time today, so play all you want."
-                    self.reset(state.guild)
+                    remark += "\nI've got lots of time today, so play all you want."
+                    await self.start_extra_round(state.channel.id)
                 elif guess_count <= BONUS_GAME_THRESHOLD:
-                    msg += "\nCare for an extra round? I've got more time to play since you were so quick."
-                    self.reset(state.guild)
+                    remark += "\nCare for an extra round? I've got more time to play since you were so quick."
+                    await self.start_extra_round(state.channel.id)
                 elif overtime:
-                    msg += "\nWould you like to play some more? I've already prepared the next round."
+                    remark += "\nWould you like to play some more? I've already prepared the next round."
                 else:
-                    msg += f"\nNext game will be ready at {time_until_next_game()}."
+                    remark += f"\nNext game will be ready at {time_until_next_game()}."
             case 'lost':
-                msg += f"You lost. The word was **{state.word.upper()}**."
+                remark += f"You lost. The word was **{state.word.upper()}**."
                 if FREE_PLAY:
-                    msg += "\nI've got lots of time today, so play all you want."
-                    self.reset(state.guild)
+                    remark += "\nI've got lots of time today, so play all you want."
+                    await self.start_extra_round(state.channel.id)
                 elif overtime:
-                    msg += "\nCare to give it another try? I've got a new word ready for you."
+                    remark += "\nCare to give it another try? I've got a new word ready for you."
                 else:
-                    msg += f"\nNext game will be ready at {time_until_next_game()}."
+                    remark += f"\nNext game will be ready at {time_until_next_game()}."
             case 'playing':
-                msg += "Available letters:\n"
+                remark += "Available letters:\n"
                 guessed_letters = {letter for guess in state.guesses for letter in guess}
                 highlighting = False
                 for letter in string.ascii_lowercase:
                     if letter in guessed_letters:
                         if letter in state.word:
                             if not highlighting:
-                                msg += "**"
+                                remark += "**"
                                 highlighting = True
-                            msg += letter
+                            remark += letter
                     else:
                         if highlighting:
-                            msg += "**"
+                            remark += "**"
                             highlighting = False
-                        msg += letter
+                        remark += letter
                 if highlighting:
-                    msg += "**"
+                    remark += "**"
                 if overtime:
-                    msg += "\nI'd like to finish this round soon, so feel free to guess multiple times."
-        await ctx.send(msg)
+                    remark += "\nI'd like to finish this round soon, so feel free to guess multiple times."
+        msg = f"{board}\n\n{remark}"
+        if state.board_mode:
+            await self.update_board(state, msg)
+            if game_state != 'playing':
+                # Edits don't notify anyone, so announce the end of the round separately
+                await ctx.send(remark)
+        else:
+            await ctx.send(msg)
 
-    async def enable(self, ctx: commands.Context):
+    async def enable(self, ctx: commands.Context, word_length: int = DEFAULT_WORD_LENGTH):
         if not ctx.channel.permissions_for(ctx.me).send_messages:
             logger.warning(f"Tried to enable Wordle in {ctx.guild.name}, but missing permissions in channel.")
             return
-        self.guilds[ctx.guild] = GuildState(guild=ctx.guild, channel=ctx.channel)
+        if word_length not in WORD_LENGTHS:
+            await ctx.send(f"I only know words of {WORD_LENGTHS.start} to {WORD_LENGTHS.stop - 1} letters.")
+            return
         async with Session.begin() as session:
-            g = await session.get(Guild, ctx.guild.id) or Guild(id=ctx.guild.id)
-            g.wordle_channel_id = ctx.channel.id
-            session.add(g)
-        await ctx.send('Wordle game enabled for this channel. Start guessing with "Maid, guess [word]".')
+            if not await session.get(Guild, ctx.guild.id):
+                session.add(Guild(id=ctx.guild.id))
+            c = await session.get(WordleChannel, ctx.channel.id) or WordleChannel(
+                channel_id=ctx.channel.id, guild_id=ctx.guild.id, board_mode=False, hard_mode=False, extra_rounds=0
+            )
+            c.word_length = word_length
+            session.add(c)
+        self.add_channel(ChannelState(
+            guild=ctx.guild, channel=ctx.channel, word_length=word_length, board_mode=c.board_mode,
+            hard_mode=c.hard_mode, extra_rounds=c.extra_rounds
+        ))
+        await self.index_emotes(ctx.guild, ctx.guild.emojis)
+        msg = 'Wordle game enabled for this channel. Start guessing with "Maid, guess [word]".'
+        if word_length != DEFAULT_WORD_LENGTH:
+            msg += f' Words are {word_length} letters long.'
+        await ctx.send(msg)
 
     async def disable(self, ctx: commands.Context):
-        del self.guilds[ctx.guild]
+        if not self.remove_channel(ctx.channel.id):
+            await ctx.send("There's no Wordle game in this channel.")
+            return
+        self.guess_locks.pop(ctx.channel.id, None)
+        await self.index_emotes(ctx.guild, ctx.guild.emojis)
+        async with Session.begin() as session:
+            await session.delete(await session.get(WordleChannel, ctx.channel.id))
+        await ctx.send('Wordle game disabled for this channel.')
+
+    async def set_board_mode(self, ctx: commands.Context, enabled: bool):
+        state = self.channels.get(ctx.channel.id)
+        if not state:
+            await ctx.send("There's no Wordle game in this channel.")
+            return
+        state.board_mode = enabled
         async with Session.begin() as session:
-            g = await session.get(Guild, ctx.guild.id)
-            g.wordle_channel_id = None
-        await ctx.send('Wordle game disabled.')
+            c = await session.get(WordleChannel, ctx.channel.id)
+            c.board_mode = enabled
+        if enabled:
+            await ctx.send("From now on I'll keep a single board per round up to date. I'll react to invalid guesses.")
+        else:
+            await ctx.send("I'll post the board after every guess again.")
+
+    async def set_hard_mode(self, ctx: commands.Context, enabled: bool):
+        state = self.channels.get(ctx.channel.id)
+        if not state:
+            await ctx.send("There's no Wordle game in this channel.")
+            return
+        state.hard_mode = enabled
+        async with Session.begin() as session:
+            c = await session.get(WordleChannel, ctx.channel.id)
+            c.hard_mode = enabled
+        if enabled:
+            await ctx.send("Hard mode it is. Every guess must use all the greens and yellows revealed so far.")
+        else:
+            await ctx.send("Back to normal mode. Guess whatever you like.")
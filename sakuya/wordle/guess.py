@@ -1,14 +1,56 @@
-import itertools
 import re
 import string
-from collections import Counter
-from collections.abc import Sequence
-from typing import Type
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Sequence
+from typing import NamedTuple, Type
 
+import discord
 import emoji
-import wordninja
 
-from .data import LETTER_EMOTES, VALID_GUESSES
+from .data import DEFAULT_WORD_LENGTH, LETTER_EMOTES, WORD_COSTS, word_data
+
+
+# Parts that can't be (part of) a guess cost more than any real split could, but not infinitely much, so the words
+# around them still get split off
+UNKNOWN_WORD_COST = 1e6
+
+
+def _segment(word: str, length: int) -> tuple[list[str], float]:
+    """Splits a word without any capitalisation hints, like "widepeepohappy", into its most likely words.
+
+    The cheapest split of each start of the word is found from those of the shorter starts, using the Zipf costs of
+    the words. Only the words in `WordData.segment_costs` for the given length are known, as the others can't be used
+    anyway, so no part needs to be longer than twice a guess. Returns the parts and the cost of the split.
+    """
+    costs = word_data(length).segment_costs
+    lowered = word.lower()
+    # Cost of the cheapest split of each start of the word, and the length of its last part
+    best = [(0.0, 0)]
+    for end in range(1, len(word) + 1):
+        best.append(min(
+            (best[start][0] + costs.get(lowered[start:end], UNKNOWN_WORD_COST), end - start)
+            for start in range(max(0, end - 2 * length), end)
+        ))
+    parts = []
+    end = len(word)
+    while end > 0:
+        parts.append(word[end - best[end][1]:end])
+        end -= best[end][1]
+    return parts[::-1], best[-1][0]
+
+
+def _split_compound(word: str, length: int) -> set[str]:
+    """Splits a compound word without any capitalisation hints, like "lawnmower", if it reads better as several words.
+
+    Only the parts that could make up (part of) a guess are returned, as the rest can't be used anyway.
+    """
+    parts, cost = _segment(word, length)
+    # Words over twice as long as a guess are unknown to the split, so check whether the word is a whole one by itself
+    if len(parts) < 2 or WORD_COSTS.get(word.lower(), UNKNOWN_WORD_COST) <= cost:
+        return set()
+    # Leave room for plurals, which are singularised later
+    return {part for part in parts if len(part) <= length or len(part) == length + 1 and part[-1] == 's'}
 
 
 class GuessSegment:
@@ -24,13 +66,14 @@ class GuessSegment:
     def _aliases(self) -> set[str]:
         return {self.value}
 
-    def explode(self) -> set[str]:
-        # Find meaningful substrings within aliases based on capitalisation, underscores, and word frequency analysis
-        values = self._aliases.union(
+    def explode(self, length: int = DEFAULT_WORD_LENGTH) -> set[str]:
+        # Find meaningful substrings within aliases based on capitalisation, underscores, and compound words
+        words = set().union(
             *(re.findall(r'[a-zA-Z][^A-Z_]*', a) for a in self._aliases),
-            *(re.findall(r'[A-Z+][^a-z_$]+', a) for a in self._aliases),
-            *(wordninja.split(a) for a in self._aliases)
+            *(re.findall(r'[A-Z+][^a-z_$]+', a) for a in self._aliases)
         )
+        parts = {p for w in self._aliases | words for p in re.split('[^a-zA-Z]+', w) if p}
+        values = self._aliases | words | parts | set().union(*(_split_compound(p, length) for p in parts))
         # Very naively attempt to add singular versions of plural nouns
         # We could use a library, but players probably don't expect e.g. "women" to turn into "woman", so this will do
         values |= {v[:-1] for v in values if v and v[-1] == 's'}
@@ -49,7 +92,15 @@ class EmojiGuessSegment(GuessSegment):
 
 
 class DiscordEmoteGuessSegment(GuessSegment):
-    pass
+    def __init__(self, value, emote_id: int = None, interpretations: frozenset[str] = None):
+        super().__init__(value)
+        self.emote_id = emote_id
+        self.interpretations = interpretations
+
+    def explode(self, length: int = DEFAULT_WORD_LENGTH) -> set[str]:
+        if self.interpretations is not None:
+            return set(self.interpretations)
+        return super().explode(length)
 
 
 class CustomGuessSegment(GuessSegment):
@@ -57,13 +108,13 @@ class CustomGuessSegment(GuessSegment):
 
 
 class StringGuessSegment(GuessSegment):
-    def explode(self) -> set[str]:
+    def explode(self, length: int = DEFAULT_WORD_LENGTH) -> set[str]:
         # Regular text in guesses should be left as is
         return {self.value.lower()}
 
 
 class GuessLengthError(Exception):
-    """Raised when a guess is not 5 letters long."""
+    """Raised when a guess is not as long as the words being played with."""
     pass
 
 
@@ -72,12 +123,45 @@ class InvalidGuessError(Exception):
     pass
 
 
-DISCORD_EMOTE_REGEX = re.compile(r'<a?:(\w+):\d+>', re.ASCII)
+DISCORD_EMOTE_REGEX = re.compile(r'<a?:(\w+):(\d+)>', re.ASCII)
 # Markdown escapes (backslashes) may occur before any character.
 SHRUG_REGEX = re.compile(''.join(r'\\?' + re.escape(char) for char in r'¯\_(ツ)_/¯'))
 
 
-def _segmentize_guess(guess: str) -> list[GuessSegment]:
+class Emote(NamedTuple):
+    """What `EmoteIndex` needs to know about a `discord.Emoji`, in a form that can be sent to worker processes."""
+    id: int
+    name: str
+
+
+class EmoteIndex:
+    """Pre-exploded interpretations of a guild's custom emotes, so popular emotes aren't segmented on every guess."""
+    def __init__(self, length: int = DEFAULT_WORD_LENGTH):
+        self.length = length
+        self._emotes: dict[int, tuple[str, frozenset[str]]] = dict()
+
+    def __len__(self):
+        return len(self._emotes)
+
+    def update(self, emotes: Iterable[discord.Emoji | Emote]):
+        """Replaces the indexed emotes, only exploding the ones that are new or have been renamed."""
+        indexed = dict()
+        for e in emotes:
+            known = self._emotes.get(e.id)
+            if not known or known[0] != e.name:
+                known = (e.name, frozenset(DiscordEmoteGuessSegment(e.name).explode(self.length)))
+            indexed[e.id] = known
+        self._emotes = indexed
+
+    def get(self, emote_id: int, name: str) -> frozenset[str] | None:
+        known = self._emotes.get(emote_id)
+        # Messages may still use an emote's old name, which should be interpreted as written
+        if known and known[0] == name:
+            return known[1]
+        return None
+
+
+def _segmentize_guess(guess: str, emotes: EmoteIndex = None) -> list[GuessSegment]:
     def segmentize(
             text, matches: Sequence[tuple[int, int, GuessSegment]], nonmatch_class: Type[str | StringGuessSegment]
     ) -> list[str | GuessSegment]:
@@ -102,8 +186,9 @@ def _segmentize_guess(guess: str) -> list[GuessSegment]:
         if isinstance(s, str):
             segments.extend(segmentize(
                 s,
-                [(m.start(), m.end(), DiscordEmoteGuessSegment(m.group(1)))
-                 for m in DISCORD_EMOTE_REGEX.finditer(s)],
+                [(m.start(), m.end(), DiscordEmoteGuessSegment(
+                    m.group(1), int(m.group(2)), emotes.get(int(m.group(2)), m.group(1)) if emotes is not None else None
+                )) for m in DISCORD_EMOTE_REGEX.finditer(s)],
                 str
             ))
         else:
@@ -126,25 +211,109 @@ def _segmentize_guess(guess: str) -> list[GuessSegment]:
     return segments
 
 
-def parse_guess(guess):
-    """Returns a valid guess. Guesses are parsed using the patented GuessGPT Emoji AI Interpretation Engine™.
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+    @classmethod
+    def total(cls, infos: Iterable['CacheInfo']) -> 'CacheInfo':
+        """Adds up the statistics of several caches, like those of each worker process."""
+        return cls(*map(sum, zip(*infos, cls(0, 0, 0, 0, 0))))
+
+    def __str__(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return (
+            f'{self.hits} hits, {self.misses} misses ({hit_rate:.0%} hit rate), {self.evictions} evictions, '
+            f'{self.currsize}/{self.maxsize} cached'
+        )
+
+
+class ParseCache:
+    """Thread-safe LRU cache of guess strings and word lengths to either a parsed guess or the error parsing raised."""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._results: OrderedDict[tuple[str, int], str | Type[Exception]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, guess: tuple[str, int]) -> str | Type[Exception] | None:
+        with self._lock:
+            result = self._results.get(guess)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._results.move_to_end(guess)
+            return result
+
+    def put(self, guess: tuple[str, int], result: str | Type[Exception]):
+        with self._lock:
+            self._results[guess] = result
+            self._results.move_to_end(guess)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops all cached results. Must be called whenever the word lists change."""
+        with self._lock:
+            self._results.clear()
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._results))
+
+
+PARSE_CACHE = ParseCache(maxsize=4096)
+
+
+def parse_guess(guess, length=DEFAULT_WORD_LENGTH, emotes: EmoteIndex = None):
+    """Returns a valid guess of the given length. Guesses are parsed using the patented GuessGPT Emoji AI Interpretation Engine™.
 
     Raises `GuessLengthError` when no guess of the correct length can be found.
     Raises `InvalidGuessError` when no guess in the valid words dictionary can be found.
+
+    Results are cached in `PARSE_CACHE`, including errors, since players tend to repeat the same guesses.
+    Custom emotes found in `emotes` skip segmentation; others are interpreted from their name as usual.
     """
+    result = PARSE_CACHE.get((guess, length))
+    if result is None:
+        try:
+            result = _parse_guess(guess, length, emotes if emotes is not None and emotes.length == length else None)
+        except (GuessLengthError, InvalidGuessError) as e:
+            result = type(e)
+        PARSE_CACHE.put((guess, length), result)
+    if isinstance(result, type):
+        raise result
+    return result
+
+
+def _parse_guess(guess, length, emotes):
     if not guess:
         raise GuessLengthError
 
-    segments = _segmentize_guess(guess)
-    if len(segments) > 5:
+    segments = _segmentize_guess(guess, emotes)
+    if len(segments) > length:
         raise GuessLengthError
-
-    # Emotes & emoji often have multiple possible interpretations, so first we generate every possible combination
-    interpretations = ["".join(i) for i in itertools.product(*[s.explode() for s in segments])]
-    if not any(len(i) == 5 for i in interpretations):
+    words = word_data(length)
+
+    # Emotes & emoji often have multiple possible interpretations, so first check whether any combination of them
+    # has the right length at all
+    exploded = [s.explode(length) for s in segments]
+    lengths = {0}
+    for values in exploded:
+        lengths = {total + len(v) for total in lengths for v in values if total + len(v) <= length}
+    if length not in lengths:
         raise GuessLengthError
-    # Then filter out interpretations that aren't valid guesses anyway
-    interpretations = [i for i in interpretations if i in VALID_GUESSES]
+    # Then build the combinations, dropping any that can no longer become a valid guess
+    interpretations = {''}
+    for values in exploded:
+        interpretations = {i + v for i in interpretations for v in values if i + v in words.prefixes}
+    interpretations = sorted(i for i in interpretations if i in words.valid_guesses)
     if not interpretations:
         raise InvalidGuessError
 
@@ -152,17 +321,17 @@ def parse_guess(guess):
     if len(segments) == 1:
         # If the guess is an emoji, the entire guess is contained within it.
         # The player most likely wants the most specific word, i.e. "woman_pilot" -> "pilot".
-        return max(interpretations, key=lambda i: wordninja.DEFAULT_LANGUAGE_MODEL._wordcost.get(i, 999))
+        return max(interpretations, key=words.rank)
     else:
         # The guess is a combination, so no single emoji contains the whole guess.
         # The player most likely wants the most obvious word, so avoid picking obscure interpretations.
-        return min(interpretations, key=lambda i: wordninja.DEFAULT_LANGUAGE_MODEL._wordcost.get(i, 999))
+        return min(interpretations, key=words.rank)
 
 
-def emojify_guess(guess, solution):
-    """Formats a guess as grey/yellow/green letter emotes."""
+def score_guess(guess, solution) -> list[int]:
+    """Scores each letter of a guess as grey (0), yellow (1) or green (2)."""
     letters = Counter(solution)
-    result = [0]*5
+    result = [0]*len(solution)
     for i, letter in enumerate(guess):
         if solution[i] == letter:
             letters[letter] -= 1
@@ -171,4 +340,10 @@ def emojify_guess(guess, solution):
         if solution[i] != letter and letters.get(letter):
             letters[letter] -= 1
             result[i] = 1
+    return result
+
+
+def emojify_guess(guess, solution):
+    """Formats a guess as grey/yellow/green letter emotes."""
+    result = score_guess(guess, solution)
     return ''.join(LETTER_EMOTES[string.ascii_lowercase.index(letter) + 26 * result[i]] for i, letter in enumerate(guess))
@@ -0,0 +1,57 @@
+"""Hard mode, in which every guess has to use the greens and yellows revealed so far."""
+import string
+from collections import Counter
+from dataclasses import dataclass, field
+
+from .guess import score_guess
+
+
+ALL_LETTERS = (1 << 26) - 1
+ORDINALS = ['1st', '2nd', '3rd', '4th', '5th', '6th', '7th']
+
+
+def _bit(letter: str) -> int:
+    return 1 << (ord(letter) - ord('a'))
+
+
+@dataclass
+class HardModeConstraints:
+    """Everything the guesses of a round have revealed, folded into a bitmask of allowed letters per position and a
+    minimum count per letter, so checking a guess doesn't involve going over all the previous ones.
+    """
+    length: int
+    masks: list[int] = None
+    min_counts: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self.masks = self.masks or [ALL_LETTERS] * self.length
+
+    @classmethod
+    def from_guesses(cls, guesses: list[str], solution: str) -> 'HardModeConstraints':
+        constraints = cls(len(solution))
+        for guess in guesses:
+            constraints.update(guess, solution)
+        return constraints
+
+    def update(self, guess: str, solution: str):
+        revealed = Counter()
+        for i, (letter, score) in enumerate(zip(guess, score_guess(guess, solution))):
+            if score == 2:
+                self.masks[i] = _bit(letter)
+            if score:
+                revealed[letter] += 1
+        # Counters' union keeps the maximum count of each letter
+        self.min_counts |= revealed
+
+    def violation(self, guess: str) -> str | None:
+        """Returns which constraint a guess breaks, if any."""
+        for i, letter in enumerate(guess):
+            if not self.masks[i] & _bit(letter):
+                required = string.ascii_lowercase[self.masks[i].bit_length() - 1]
+                return f'The {ORDINALS[i]} letter must be **{required.upper()}**.'
+        counts = Counter(guess)
+        for letter, count in self.min_counts.items():
+            if counts[letter] < count:
+                times = {1: '', 2: ' twice'}.get(count, f' {count} times')
+                return f'Your guess must contain **{letter.upper()}**{times}.'
+        return None
@@ -0,0 +1,41 @@
+"""Deterministic word schedules, so the word for any round can be worked out again after a restart.
+
+Each channel plays through its own shuffle of the word list, one word per round, so no word comes up twice before
+every other word has had its turn. Every pass through the list is shuffled anew. The shuffles are seeded by the
+channel and `SEED`; set the latter to keep players who know a channel's id from working out upcoming words.
+"""
+import os
+import random
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+
+
+SEED = os.getenv('SAKUYA_WORDLE_SEED', '')
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def round_number(game_start: datetime, game_timedelta: timedelta) -> int:
+    """Numbers rounds consecutively, counting from the one that started at `EPOCH`. `game_start` must start a round."""
+    # Rounded rather than floored, as a round length that doesn't divide a day evenly is only accurate to a microsecond
+    return round((game_start - EPOCH) / game_timedelta)
+
+
+class WordSchedule:
+    def __init__(self, channel_id: int, words: Sequence[str]):
+        self.channel_id = channel_id
+        self.words = words
+        self._cycle: int = None
+        self._order: list[str] = []
+
+    def _shuffle(self, cycle: int) -> list[str]:
+        order = list(self.words)
+        # String seeds are hashed the same way in every process, unlike hash() of a tuple
+        random.Random(f'{SEED}:{self.channel_id}:{cycle}').shuffle(order)
+        return order
+
+    def word(self, round_number: int) -> str:
+        cycle, position = divmod(round_number, len(self.words))
+        if cycle != self._cycle:
+            # Only the current pass through the list is kept, so this happens once per pass rather than per round
+            self._cycle, self._order = cycle, self._shuffle(cycle)
+        return self._order[position]
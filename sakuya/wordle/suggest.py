@@ -0,0 +1,54 @@
+"""Suggestions of valid guesses for words the game doesn't know, most likely typos.
+
+Guesses always have the right length, so typos are letters typed wrong or swapped. Every valid guess is indexed under
+each pattern it matches with up to `MAX_DISTANCE` of its letters blanked out; a word with at most that many wrong
+letters shares one of those patterns, so a lookup only generates the typo's own patterns rather than comparing it with
+every word.
+"""
+from collections import defaultdict
+from functools import cache
+from itertools import combinations
+
+from .data import DEFAULT_WORD_LENGTH, word_data
+
+
+MAX_DISTANCE = 2
+MAX_SUGGESTIONS = 3
+
+
+def _patterns(word: str) -> list[str]:
+    patterns = []
+    for n in range(MAX_DISTANCE + 1):
+        for blanked in combinations(range(len(word)), n):
+            letters = list(word)
+            for i in blanked:
+                letters[i] = '_'
+            patterns.append(''.join(letters))
+    return patterns
+
+
+def distance(a: str, b: str) -> int:
+    """Number of wrong letters, counting a swap of neighbouring letters as a single mistake."""
+    wrong = [i for i in range(len(a)) if a[i] != b[i]]
+    if len(wrong) == 2 and wrong[1] == wrong[0] + 1 and a[wrong[0]] == b[wrong[1]] and a[wrong[1]] == b[wrong[0]]:
+        return 1
+    return len(wrong)
+
+
+@cache
+def suggestion_index(length: int = DEFAULT_WORD_LENGTH) -> dict[str, tuple[str, ...]]:
+    index = defaultdict(list)
+    for word in word_data(length).valid_guesses:
+        for pattern in _patterns(word):
+            index[pattern].append(word)
+    return {pattern: tuple(words) for pattern, words in index.items()}
+
+
+def suggest(word: str, length: int = DEFAULT_WORD_LENGTH) -> list[str]:
+    """Returns the valid guesses closest to `word`, more common words first among equally close ones."""
+    if len(word) != length:
+        return []
+    index = suggestion_index(length)
+    words = word_data(length)
+    candidates = {c for pattern in _patterns(word) for c in index.get(pattern, ())}
+    return sorted(candidates, key=lambda c: (distance(word, c), words.rank(c), c))[:MAX_SUGGESTIONS]
@@ -0,0 +1,118 @@
+"""Offloads CPU-heavy cog logic to worker processes, so it can't hold up the gateway's heartbeats.
+
+The gateway process keeps handling everything that touches Discord, and sends the expensive part of an event (parsing
+a guess, clustering a join) to a worker as plain data. Each guild is pinned to one worker, so state the work needs
+between events, like a guild's emote index, lives in that worker and nowhere else.
+
+With no workers configured, the work runs inline in the gateway process exactly as if it were a worker.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Hashable, TypeVar
+
+
+WORKER_COUNT = int(os.getenv('SAKUYA_WORKERS', '0'))
+
+T = TypeVar('T')
+logger = logging.getLogger(__name__)
+
+# State owned by the current process, keyed by (kind, guild id); see `local`
+_local: dict[tuple[str, Hashable], Any] = dict()
+
+
+def local(kind: str, guild_id: int, factory: Callable[[], T]) -> T:
+    """Returns this process' `kind` state for a guild, creating it if needed.
+
+    Only call this from functions run through `WorkerPool.run` with the same guild id, which guarantees every call for
+    a guild lands in the same process.
+    """
+    key = (kind, guild_id)
+    if key not in _local:
+        _local[key] = factory()
+    return _local[key]
+
+
+def discard(kind: str, guild_id: int):
+    _local.pop((kind, guild_id), None)
+
+
+class WorkerPool:
+    def __init__(self, count: int = 0):
+        self.executors = [self._executor() for _ in range(count)]
+
+    @staticmethod
+    def _executor() -> ProcessPoolExecutor:
+        # Forking a process with a running event loop and open sockets is asking for trouble, so always spawn
+        context = multiprocessing.get_context('spawn')
+        # One single-process executor per worker rather than one shared pool, which would hand tasks to any process
+        return ProcessPoolExecutor(max_workers=1, mp_context=context)
+
+    def __len__(self):
+        return len(self.executors)
+
+    def worker_for(self, guild_id: int) -> int:
+        return guild_id % len(self.executors)
+
+    async def run(self, guild_id: int, fn: Callable[..., T], *args) -> T:
+        """Runs `fn(*args)` in the worker the guild is pinned to. Arguments and results must be picklable.
+
+        If the worker has died, it's replaced and `fn` runs in the new one.
+        """
+        if not self.executors:
+            return fn(*args)
+        return await self._run_in(self.worker_for(guild_id), fn, args)
+
+    async def run_all(self, fn: Callable[..., T], *args) -> list[T]:
+        """Runs `fn(*args)` once in every worker, or inline if there are none, e.g. to read per-process statistics."""
+        if not self.executors:
+            return [fn(*args)]
+        return await asyncio.gather(*(self._run_in(worker, fn, args) for worker in range(len(self.executors))))
+
+    async def _run_in(self, worker: int, fn: Callable[..., T], args: tuple) -> T:
+        try:
+            return await self._submit(worker, fn, args)
+        except BrokenProcessPool:
+            # The worker died (out of memory, a crash in native code) and its executor won't take any more work.
+            # Whatever state it held for its guilds is gone with it, so they start over in a fresh one.
+            return await self._submit(worker, fn, args)
+
+    async def _submit(self, worker: int, fn: Callable[..., T], args: tuple) -> T:
+        executor = self.executors[worker]
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+        except BrokenProcessPool:
+            self._replace(worker, executor)
+            raise
+
+    def _replace(self, worker: int, broken: ProcessPoolExecutor):
+        # Every task that was waiting on the dead worker ends up here, but only the first needs to replace it
+        if self.executors[worker] is broken:
+            logger.warning(f'Worker {worker} died, starting a new one.')
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executors[worker] = self._executor()
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+pool = WorkerPool(WORKER_COUNT)
+
+
+def configure(count: int):
+    """Replaces the pool with one of `count` workers.
+
+    Worker state doesn't carry over, so do this before loading any cogs.
+    """
+    global pool
+    pool.shutdown()
+    _local.clear()
+    pool = WorkerPool(count)
+    if count:
+        logger.info(f'Running CPU-heavy work in {count} worker processes.')
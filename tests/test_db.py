@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from sakuya.db import pool_options
+
+
+POOL_ENV = {'SAKUYA_DB_POOL_SIZE': '5', 'SAKUYA_DB_MAX_OVERFLOW': '10', 'SAKUYA_DB_POOL_RECYCLE': '3600'}
+
+
+def test_pool_settings_with_default_database():
+    # The engine is created on import, so this needs a fresh interpreter
+    result = subprocess.run(
+        [sys.executable, '-c', 'from sakuya.db import engine; print(type(engine.pool).__name__)'],
+        env=os.environ | POOL_ENV, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'NullPool'
+
+
+def test_pool_options_only_apply_to_pooled_backends(monkeypatch):
+    monkeypatch.setattr('sakuya.db.POOL_OPTIONS', {'pool_size': 5})
+    assert pool_options('sqlite+aiosqlite:///db.sqlite') == {}
+    assert pool_options('postgresql+asyncpg://sakuya@localhost/sakuya') == {'pool_size': 5}
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from harness import SCENARIOS, run_scenario
+from harness.db_benchmark import run_benchmark
+
+
+@pytest.mark.parametrize('scenario', SCENARIOS)
+def test_scenario_runs_cleanly(scenario):
+    report = asyncio.run(run_scenario(scenario, guilds=3, count=50))
+    assert report.events == 50
+    assert report.errors == 0
+    assert report.outbound > 0
+
+
+def test_join_flood_alerts_are_muted():
+    # Three alerts per guild at most, then Sentinel stays quiet until the raid is over
+    report = asyncio.run(run_scenario('join-flood', guilds=2, count=200, rate=5000))
+    assert report.outbound == 6
+
+
+def test_guess_burst_reports_parse_cache():
+    report = asyncio.run(run_scenario('guess-burst', guilds=3, count=50))
+    assert report.parse_cache.hits + report.parse_cache.misses == 50
+    assert 'parse cache:' in str(report)
+    assert asyncio.run(run_scenario('chat', guilds=3, count=50)).parse_cache is None
+
+
+def test_db_benchmark_uses_partial_indexes():
+    untuned, tuned = asyncio.run(run_benchmark(guilds=500, enabled=10, repeat=2))
+    assert all(len(t.samples) == 2 for t in untuned.timings + tuned.timings)
+    assert untuned.plans['sentinel startup'].startswith('SCAN')
+    assert 'ix_guilds_sentinel_channel_id' in tuned.plans['sentinel startup']
+    assert 'ix_guilds_minecraft_channel_id' in tuned.plans['minecraft startup']
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sakuya.join_clusters import JOIN_WINDOW, MIN_CLUSTER_SIZE, JoinClusterDetector, _signature
+
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def member(i, name, created_at=NOW - timedelta(days=400), avatar='abc'):
+    return SimpleNamespace(id=i, mention=f'<@{i}>', name=name, created_at=created_at, avatar=avatar)
+
+
+def test_similar_names_cluster():
+    detector = JoinClusterDetector()
+    clusters = [detector.add(member(i, f'free_nitro_{i}'), NOW + timedelta(seconds=i)) for i in range(5)]
+    assert clusters[:MIN_CLUSTER_SIZE - 1] == [None] * (MIN_CLUSTER_SIZE - 1)
+    assert len(clusters[-1]) == 5
+    assert clusters[-1].reasons == {'near-identical names'}
+
+
+def test_unrelated_names_do_not_cluster():
+    detector = JoinClusterDetector()
+    names = ['alice', 'Trif', 'xXgamerXx', 'marisa_kirisame', 'remilia', 'patchouli']
+    assert all(detector.add(member(i, n), NOW + timedelta(seconds=i)) is None for i, n in enumerate(names))
+
+
+def test_default_avatars_created_together_cluster():
+    detector = JoinClusterDetector()
+    names = ['alice', 'Trif', 'xXgamerXx']
+    clusters = [detector.add(member(i, n, created_at=NOW, avatar=None), NOW) for i, n in enumerate(names)]
+    assert clusters[-1].reasons == {'default avatars and matching account creation times'}
+
+
+def test_window_expires():
+    detector = JoinClusterDetector()
+    for i in range(10):
+        detector.add(member(i, f'raider{i}'), NOW)
+    assert detector.add(member(10, 'raider10'), NOW + JOIN_WINDOW * 2) is None
+    assert len(detector.window) == 1
+    assert all(len(b) == 1 for b in detector.buckets.values())
+
+
+def test_window_survives_restart():
+    detector = JoinClusterDetector()
+    for i in range(MIN_CLUSTER_SIZE - 1):
+        detector.add(member(i, f'free_nitro_{i}'), NOW)
+    detector = JoinClusterDetector.load(json.loads(json.dumps(detector.dump())))
+    cluster = detector.add(member(9, 'free_nitro_9'), NOW + timedelta(seconds=1))
+    assert [j.member_id for j in cluster.joins] == [*range(MIN_CLUSTER_SIZE - 1), 9]
+
+
+def test_signatures_are_stable_across_processes():
+    code = 'from sakuya.join_clusters import _signature; print(_signature("free_nitro"))'
+    signatures = {
+        subprocess.run(
+            [sys.executable, '-c', code], env={**os.environ, 'PYTHONHASHSEED': seed}, capture_output=True, text=True,
+            check=True
+        ).stdout
+        for seed in ('1', '2')
+    }
+    assert signatures == {f'{_signature("free_nitro")}\n'}
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from harness import FakeContext, FakeGuild, FakeMember, HarnessBot, use_memory_db
+from sakuya import join_log, sentinel as sentinel_module
+from sakuya.sentinel import Sentinel
+
+
+NOW = datetime(2024, 1, 31, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2h', NOW - timedelta(hours=2)),
+    ('1d 12h', NOW - timedelta(days=1, hours=12)),
+    ('90m', NOW - timedelta(minutes=90)),
+    ('11:30', datetime(2024, 1, 31, 11, 30, tzinfo=timezone.utc)),
+    ('13:00', datetime(2024, 1, 30, 13, 0, tzinfo=timezone.utc)),
+    ('2024-01-30 08:00', datetime(2024, 1, 30, 8, 0, tzinfo=timezone.utc)),
+])
+def test_parse_since(text, expected):
+    assert join_log.parse_since(text, NOW) == expected
+
+
+@pytest.mark.parametrize('text', ['', 'yesterday', '25:00'])
+def test_parse_since_rejects_nonsense(text):
+    with pytest.raises(ValueError):
+        join_log.parse_since(text, NOW)
+
+
+def test_joins_are_logged_in_batches_and_expire(monkeypatch):
+    # Only flag by account age, the fake members would otherwise all cluster together
+    monkeypatch.setattr(sentinel_module, '_worker_add_join', lambda *args: None)
+
+    async def run():
+        await use_memory_db()
+        bot = HarnessBot()
+        guild = FakeGuild(name='Guild')
+        channel = guild.add_channel()
+        bot.add_guild(guild)
+        sentinel = Sentinel(bot)
+        await bot.add_cog(sentinel)
+        await sentinel.enable(FakeContext(bot, channel, FakeMember(guild=guild, name='mod')))
+
+        old = datetime.now(timezone.utc) - timedelta(days=365)
+        for i in range(join_log.BATCH_SIZE):
+            await sentinel.on_member_join(FakeMember(guild=guild, name=f'{i}', created_at=old))
+        await asyncio.sleep(0)  # the full buffer is written out in the background
+        assert not sentinel.join_log.rows
+        await sentinel.on_member_join(FakeMember(guild=guild, name='newbie'))
+        assert len(sentinel.join_log.rows) == 1
+
+        now = datetime.now(timezone.utc)
+        joins = await join_log.joins_since(guild.id, now - timedelta(hours=1))
+        assert len(joins) == join_log.BATCH_SIZE
+        ctx = FakeContext(bot, channel, FakeMember(guild=guild, name='mod'))
+        await sentinel.joins(ctx, 'since', since='1h')
+        assert channel.history[-1].content.startswith(f'{join_log.BATCH_SIZE + 1} joins since')
+        assert channel.history[-1].content.count('⚠️') == 1
+
+        assert await join_log.expire(now + join_log.RETENTION + timedelta(minutes=1)) == join_log.BATCH_SIZE + 1
+        assert not await join_log.joins_since(guild.id, now - timedelta(hours=1))
+
+    asyncio.run(run())
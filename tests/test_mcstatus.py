@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+from sakuya import mcstatus
+from sakuya.mcstatus import StatusCache, ping_server
+
+
+STATUS = {
+    'version': {'name': '1.20.1', 'protocol': 763},
+    'players': {'max': 20, 'online': 2, 'sample': [{'name': 'Steve', 'id': '0'}, {'name': 'Alex', 'id': '1'}]},
+    'description': {'text': 'A ', 'extra': [{'text': '§aMinecraft'}, ' Server']},
+}
+
+
+async def read_varint(reader):
+    value = 0
+    for i in range(5):
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << 7 * i
+        if not byte & 0x80:
+            return value
+
+
+async def fake_server(status: dict):
+    """Starts a server that answers status pings like a vanilla server does, and counts the pings."""
+    pings = []
+
+    async def handle(reader, writer):
+        pings.append(None)
+        await reader.readexactly(await read_varint(reader))  # handshake
+        await reader.readexactly(await read_varint(reader))  # status request
+        await asyncio.sleep(0.05)
+        writer.write(mcstatus._packet(0x00, mcstatus._string(json.dumps(status))))
+        ping = await reader.readexactly(await read_varint(reader))
+        writer.write(mcstatus._packet(0x01, ping[1:]))
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1], pings
+
+
+def test_ping_server():
+    async def run():
+        server, port, _ = await fake_server(STATUS)
+        async with server:
+            status = await ping_server('127.0.0.1', port)
+        assert status.online
+        assert status.version == '1.20.1'
+        assert status.motd == 'A Minecraft Server'
+        assert (status.players_online, status.players_max) == (2, 20)
+        assert status.players == ['Alex', 'Steve']
+
+    asyncio.run(run())
+
+
+def test_status_cache_coalesces_requests():
+    async def run():
+        server, port, pings = await fake_server(STATUS)
+        async with server:
+            cache = StatusCache(f'127.0.0.1:{port}')
+            statuses = await asyncio.gather(*(cache.get() for _ in range(20)))
+            assert all(s is statuses[0] and s.online for s in statuses)
+            await cache.get()
+            assert len(pings) == 1
+            await cache.refresh()
+            assert len(pings) == 2
+
+    asyncio.run(run())
+
+
+def test_unreachable_server_is_offline():
+    async def run():
+        server, port, _ = await fake_server(STATUS)
+        server.close()
+        await server.wait_closed()
+        status = await StatusCache(f'127.0.0.1:{port}').get()
+        assert not status.online
+
+    asyncio.run(run())
+
+
+async def fake_rcon_server(password: str, response: str, fragment: int = 4096):
+    """Starts a server that answers RCON like a vanilla server does, splitting long responses over several packets."""
+    async def handle(reader, writer):
+        try:
+            while True:
+                request_id, packet_type, payload = await mcstatus._read_rcon_packet(reader)
+                if packet_type == mcstatus.RCON_LOGIN:
+                    ok = payload == password
+                    writer.write(mcstatus._rcon_packet(request_id if ok else -1, mcstatus.RCON_COMMAND))
+                elif packet_type == mcstatus.RCON_COMMAND:
+                    assert payload == 'list'
+                    for i in range(0, len(response), fragment):
+                        writer.write(mcstatus._rcon_packet(request_id, 0, response[i:i + fragment]))
+                else:
+                    writer.write(mcstatus._rcon_packet(request_id, 0, f'Unknown request {packet_type}'))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_rcon_fills_in_players_missing_from_sample():
+    async def run():
+        server, port, _ = await fake_server(STATUS | {'players': STATUS['players'] | {'online': 3}})
+        rcon_server, rcon_port = await fake_rcon_server(
+            'hunter2', 'There are 3 of a max of 20 players online: Steve, Alex, Herobrine', fragment=10
+        )
+        async with server, rcon_server:
+            status = await StatusCache(
+                f'127.0.0.1:{port}', rcon_address=f'127.0.0.1:{rcon_port}', rcon_pass='hunter2'
+            ).get()
+        assert status.players == ['Alex', 'Herobrine', 'Steve']
+
+    asyncio.run(run())
+
+
+def test_rcon_failure_keeps_sample():
+    async def run():
+        server, port, _ = await fake_server(STATUS | {'players': STATUS['players'] | {'online': 3}})
+        rcon_server, rcon_port = await fake_rcon_server('hunter2', 'There are 3 of a max of 20 players online: x')
+        async with server, rcon_server:
+            status = await StatusCache(
+                f'127.0.0.1:{port}', rcon_address=f'127.0.0.1:{rcon_port}', rcon_pass='wrong'
+            ).get()
+        assert status.online
+        assert status.players == ['Alex', 'Steve']
+
+    asyncio.run(run())
@@ -0,0 +1,15 @@
+import discord
+
+from sakuya import members
+
+
+def test_full_cache_keeps_default_flags(monkeypatch):
+    monkeypatch.setattr(members, 'MEMBER_CACHE_MODE', 'full')
+    assert members.member_cache_flags() is None
+    state = discord.Client(intents=discord.Intents.default(), member_cache_flags=members.member_cache_flags())._connection
+    assert state.member_cache_flags.voice
+
+
+def test_minimal_cache_keeps_nothing(monkeypatch):
+    monkeypatch.setattr(members, 'MEMBER_CACHE_MODE', 'minimal')
+    assert members.member_cache_flags() == discord.MemberCacheFlags.none()
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+from harness import FakeContext, FakeGuild, FakeMember, HarnessBot, use_memory_db
+from sakuya import purge, sentinel as sentinel_module, snapshot
+from sakuya.sentinel import Sentinel
+
+
+RAIDERS = 30
+
+
+async def raided_guild(monkeypatch):
+    # Only flag by account age, so the old accounts below stay unflagged
+    monkeypatch.setattr(sentinel_module, '_worker_add_join', lambda *args: None)
+    monkeypatch.setattr(purge, 'PROGRESS_INTERVAL', 0.01)
+    await use_memory_db()
+    bot = HarnessBot()
+    guild = FakeGuild(name='Guild')
+    channel = guild.add_channel()
+    bot.add_guild(guild)
+    sentinel = Sentinel(bot)
+    await bot.add_cog(sentinel)
+    await sentinel.on_ready()
+    await sentinel.enable(FakeContext(bot, channel, FakeMember(guild=guild, name='mod')))
+    raiders = [FakeMember(guild=guild, name=f'raider{i}') for i in range(RAIDERS)]
+    for member in raiders:
+        await sentinel.on_member_join(member)
+    old = datetime.now(timezone.utc) - timedelta(days=365)
+    for i in range(5):
+        await sentinel.on_member_join(FakeMember(guild=guild, name=f'regular{i}', created_at=old))
+    return bot, guild, channel, sentinel, raiders
+
+
+def test_preview_and_ban(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+
+    async def run():
+        bot, guild, channel, sentinel, raiders = await raided_guild(monkeypatch)
+        ctx = FakeContext(bot, channel, FakeMember(guild=guild, name='mod'))
+        await sentinel.purge(ctx, 'raid', 'preview', 'since', since='1h')
+        assert channel.history[-1].content.startswith(f'This would remove {RAIDERS} flagged accounts')
+        assert not guild.removed
+
+        await sentinel.purge(ctx, 'raid', 'ban', 'since', since='1h')
+        await sentinel.guilds[guild].purge_task
+        assert guild.removed == {m.id: 'ban' for m in raiders}
+        assert channel.history[-1].content == f'Banned {RAIDERS}/{RAIDERS} flagged accounts.'
+
+        await sentinel.purge(ctx, 'raid', 'ban', 'since', since='1h')
+        await sentinel.guilds[guild].purge_task
+        assert channel.history[-1].content == 'There are no flagged accounts left to ban.'
+        assert guild.removal_requests == RAIDERS
+
+    asyncio.run(run())
+
+
+def test_purge_resumes_after_restart(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+
+    async def run():
+        bot, guild, channel, sentinel, raiders = await raided_guild(monkeypatch)
+        guild.removal_latency = 0.01
+        ctx = FakeContext(bot, channel, FakeMember(guild=guild, name='mod'))
+        await sentinel.purge(ctx, 'raid', 'kick', 'since', since='1h')
+        await asyncio.sleep(0.025)
+        await bot.remove_cog('Sentinel')
+        assert 0 < len(guild.removed) < RAIDERS
+
+        sentinel = Sentinel(bot)
+        await bot.add_cog(sentinel)
+        await sentinel.on_ready()
+        await sentinel.guilds[guild].purge_task
+        assert guild.removed == {m.id: 'kick' for m in raiders}
+        assert guild.removal_requests == RAIDERS
+
+    asyncio.run(run())
+
+
+def test_purge_skips_members_it_cannot_remove(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+
+    async def run():
+        bot, guild, channel, sentinel, raiders = await raided_guild(monkeypatch)
+        guild.protected = {raiders[0].id}
+        ctx = FakeContext(bot, channel, FakeMember(guild=guild, name='mod'))
+        await sentinel.purge(ctx, 'raid', 'ban', 'since', since='1h')
+        await sentinel.guilds[guild].purge_task
+        assert guild.removed == {m.id: 'ban' for m in raiders[1:]}
+        assert channel.history[-1].content == f'Banned {RAIDERS - 1}/{RAIDERS} flagged accounts (1 failed).'
+
+    asyncio.run(run())
+
+
+def test_purge_needs_permission(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+
+    async def run():
+        bot, guild, channel, sentinel, raiders = await raided_guild(monkeypatch)
+        guild.me.guild_permissions = discord.Permissions(ban_members=True)
+        ctx = FakeContext(bot, channel, FakeMember(guild=guild, name='mod'))
+        await sentinel.purge(ctx, 'raid', 'kick', 'since', since='1h')
+        await sentinel.guilds[guild].purge_task
+        assert channel.history[-1].content == "I'm not allowed to kick members here."
+        assert guild.removal_requests == 0
+
+    asyncio.run(run())
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import signal
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from harness import FakeContext, FakeGuild, FakeMember, HarnessBot, use_memory_db
+from sakuya import snapshot, workers
+from sakuya.sentinel import Sentinel
+from sakuya.wordle import Wordle
+
+
+async def restart(bot, cog_class):
+    """Unloads the cog like a shutdown would, then starts a fresh instance of it, with fresh worker state."""
+    await bot.remove_cog(cog_class.__name__)
+    workers._local.clear()
+    cog = cog_class(bot)
+    await bot.add_cog(cog)
+    await cog.on_ready()
+    return cog
+
+
+def test_sentinel_and_wordle_survive_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+
+    async def run():
+        await use_memory_db()
+        bot = HarnessBot()
+        guild = FakeGuild(name='Guild')
+        channel = guild.add_channel()
+        bot.add_guild(guild)
+        sentinel = Sentinel(bot)
+        wordle = Wordle(bot)
+        await bot.add_cog(sentinel)
+        await bot.add_cog(wordle)
+        await sentinel.on_ready()
+        await wordle.on_ready()
+        ctx = FakeContext(bot, channel, FakeMember(guild=guild, name='mod'))
+        await sentinel.enable(ctx)
+        await wordle.enable(ctx)
+
+        for i in range(2):
+            await sentinel.on_member_join(FakeMember(guild=guild, name=f'raider{i}'))
+        await wordle.guess(FakeContext(bot, channel, FakeMember(guild=guild, name='player')), 'crane')
+        state = wordle.channels[channel.id]
+
+        sentinel = await restart(bot, Sentinel)
+        wordle = await restart(bot, Wordle)
+        assert sentinel.guilds[guild].recent_alerts == 2
+        restored = wordle.channels[channel.id]
+        assert (restored.word, restored.game_start, restored.guesses) == (state.word, state.game_start, ['crane'])
+        assert restored.guessers == state.guessers
+        await bot.close()
+
+    asyncio.run(run())
+
+
+def test_sentinel_recognises_raid_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+
+    async def run():
+        await use_memory_db()
+        bot = HarnessBot()
+        guild = FakeGuild(name='Guild')
+        channel = guild.add_channel()
+        bot.add_guild(guild)
+        sentinel = Sentinel(bot)
+        await bot.add_cog(sentinel)
+        await sentinel.on_ready()
+        await sentinel.enable(FakeContext(bot, channel, FakeMember(guild=guild, name='mod')))
+        for i in range(2):
+            await sentinel.on_member_join(FakeMember(guild=guild, name=f'free_nitro_{i}'))
+
+        sentinel = await restart(bot, Sentinel)
+        await sentinel.on_member_join(FakeMember(guild=guild, name='free_nitro_2'))
+        assert 'They look like part of a group: 3 recent joins' in channel.history[-1].content
+        await bot.close()
+
+    asyncio.run(run())
+
+
+def test_wordle_channels_are_independent(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+
+    async def run():
+        await use_memory_db()
+        bot = HarnessBot()
+        guild = FakeGuild(name='Guild')
+        channels = [guild.add_channel('wordle'), guild.add_channel('wordle-long')]
+        bot.add_guild(guild)
+        wordle = Wordle(bot)
+        await bot.add_cog(wordle)
+        await wordle.on_ready()
+        await wordle.enable(FakeContext(bot, channels[0], FakeMember(guild=guild, name='mod')))
+        await wordle.enable(FakeContext(bot, channels[1], FakeMember(guild=guild, name='mod')), 6)
+        player = FakeMember(guild=guild, name='player')
+        await wordle.guess(FakeContext(bot, channels[0], player), 'crane')
+        await wordle.guess(FakeContext(bot, channels[1], player), 'planet')
+
+        wordle = await restart(bot, Wordle)
+        assert [wordle.channels[c.id].guesses for c in channels] == [['crane'], ['planet']]
+        assert wordle.guild_channels == {guild.id: {c.id for c in channels}}
+        await wordle.disable(FakeContext(bot, channels[0], FakeMember(guild=guild, name='mod')))
+        assert wordle.guild_channels == {guild.id: {channels[1].id}}
+        wordle = await restart(bot, Wordle)
+        assert list(wordle.channels) == [channels[1].id]
+        await wordle.disable(FakeContext(bot, channels[1], FakeMember(guild=guild, name='mod')))
+        assert not wordle.guild_channels
+        await bot.close()
+
+    asyncio.run(run())
+
+
+def test_wordle_extra_rounds_get_new_words(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+
+    async def run():
+        await use_memory_db()
+        bot = HarnessBot()
+        guild = FakeGuild(name='Guild')
+        channel = guild.add_channel('wordle')
+        bot.add_guild(guild)
+        wordle = Wordle(bot)
+        await bot.add_cog(wordle)
+        await wordle.on_ready()
+        await wordle.enable(FakeContext(bot, channel, FakeMember(guild=guild, name='mod')))
+
+        async def guess(text: str):
+            wordle.channels[channel.id].last_guess_at = datetime.utcfromtimestamp(0)
+            await wordle.guess(FakeContext(bot, channel, FakeMember(guild=guild, name='player')), text)
+
+        await guess('crane')
+        first_word = wordle.channels[channel.id].word
+        if first_word != 'crane':
+            await guess(first_word)
+        # Won quickly enough for a bonus round, which must not replay the same word
+        assert wordle.channels[channel.id].extra_rounds == 1
+        await guess('crane')
+        assert wordle.channels[channel.id].word != first_word
+
+        wordle = await restart(bot, Wordle)
+        assert wordle.channels[channel.id].extra_rounds == 1
+        await bot.close()
+
+    asyncio.run(run())
+
+
+def test_stale_snapshot_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+    snapshot.save('test', {'1': 2})
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_MAX_AGE', timedelta(0))
+    assert snapshot.load('test') == {}
+    assert not list(tmp_path.iterdir())
+
+
+def test_shutdown_saves_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path)
+    from sakuya import client
+    # Unloading the extensions drops their modules, which the other tests still use
+    for name, module in list(sys.modules.items()):
+        if name.startswith('sakuya.'):
+            monkeypatch.setitem(sys.modules, name, module)
+
+    async def connect(token: str):
+        client.bot.dispatch('ready')
+        # Stopped like a deploy would, while still connected
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.Event().wait()
+
+    async def run():
+        await use_memory_db()
+        monkeypatch.setattr(client.bot, 'start', connect)
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.create_task(client.start('token'))
+        assert client.bot.is_closed()
+        assert {p.name for p in tmp_path.iterdir()} >= {'sentinel.json', 'wordle.json'}
+
+    asyncio.run(run())
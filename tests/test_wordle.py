@@ -1,6 +1,13 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
 import pytest
 
-from sakuya.wordle.guess import GuessLengthError, parse_guess
+from sakuya.wordle.data import LETTER_EMOTES, word_data
+from sakuya.wordle.guess import PARSE_CACHE, EmoteIndex, GuessLengthError, InvalidGuessError, emojify_guess, parse_guess
+from sakuya.wordle.hard_mode import HardModeConstraints
+from sakuya.wordle.schedule import WordSchedule, round_number
+from sakuya.wordle.suggest import suggest
 
 
 @pytest.mark.parametrize('guess,expected', [
@@ -17,7 +24,15 @@ from sakuya.wordle.guess import GuessLengthError, parse_guess
     ('🐟<:y_grey:931613702199857243>', 'fishy'),  # emoji + Discord emote
     ('<:lawnmower:927011154868449350>', 'mower'),  # compound word
     ('<:AYAYAWeird:807004237573390428>', 'weird'),  # compound word
-    ('s<:tetriuTea:828458481857593344>m', 'steam'),  # compound word with hinted separation that wordninja fails on
+    ('<:shellscopper:1>', 'shell'),  # compound word with a plural
+    ('<:OMEGALUL:1>', 'omega'),  # compound word split in more than two parts
+    ('<:owoheart:1>', 'heart'),  # compound word with a part that isn't a guess
+    ('<:uwusmile:1>', 'smile'),
+    ('<:nyanheart:1>', 'heart'),
+    ('<:lulsmile:1>', 'smile'),
+    ('<:widepeepohappy:1>', 'happy'),
+    ('<:copiumhigh:1>', 'opium'),
+    ('s<:tetriuTea:828458481857593344>m', 'steam'),  # compound word with hinted separation that a plain split fails on
     ('<:trifAYAYA:713868338891194398>', 'ayaya'),  # compound word with all capital letters at the end
     ('👩‍✈️', 'pilot'),  # two valid words
     ('👍', 'thumb'),  # plural -> singular
@@ -35,3 +50,103 @@ def test_parse_guess(guess, expected):
     else:
         with pytest.raises(GuessLengthError):
             parse_guess(guess)
+
+
+def test_parse_guess_cache():
+    PARSE_CACHE.clear()
+    before = PARSE_CACHE.info()
+    for _ in range(3):
+        assert parse_guess('🦈') == 'shark'
+        with pytest.raises(InvalidGuessError):
+            parse_guess('xqzzt')
+    after = PARSE_CACHE.info()
+    assert after.misses - before.misses == 2
+    assert after.hits - before.hits == 4
+    assert after.currsize == 2
+
+
+@pytest.mark.parametrize('guess,length,expected', [
+    ('🐟', 4, 'fish'),
+    ('🐟', 5, None),
+    ('🍳', 7, 'cooking'),
+    ('s🐑r', 4, None),
+    ('🏂', 4, 'snow'),  # "boarder" is too long to be a guess, but mustn't be split up for one
+])
+def test_parse_guess_word_length(guess, length, expected):
+    if expected:
+        assert parse_guess(guess, length) == expected
+    else:
+        with pytest.raises(GuessLengthError):
+            parse_guess(guess, length)
+
+
+@pytest.mark.parametrize('word', ['barr', 'torr', 'mixe', 'rabi', 'lnhq', 'wjac', 'ybbs', 'tten', 'gtmo', 'coloni'])
+def test_word_lists_only_have_words(word):
+    words = word_data(len(word))
+    assert word not in words.valid_guesses
+    assert word not in words.word_list
+
+
+@pytest.mark.parametrize('guess,solution,expected', [
+    ('crane', 'cigar', [2, 1, 1, 0, 0]),
+    ('ab', 'ba', [1, 1]),
+    ('letters', 'settler', [1, 2, 2, 2, 1, 1, 1]),
+])
+def test_emojify_guess(guess, solution, expected):
+    emotes = [LETTER_EMOTES[ord(letter) - ord('a') + 26 * result] for letter, result in zip(guess, expected)]
+    assert emojify_guess(guess, solution) == ''.join(emotes)
+
+
+def test_emote_index():
+    index = EmoteIndex()
+    index.update([SimpleNamespace(id=1, name='lawnmower')])
+    assert index.get(1, 'lawnmower') == {'lawnmower', 'lawn', 'mower'}
+    assert index.get(1, 'lawnmowers') is None  # old or foreign names are interpreted as written
+    assert index.get(2, 'lawnmower') is None
+    index.update([SimpleNamespace(id=1, name='AYAYA'), SimpleNamespace(id=2, name='thumbsup')])
+    assert 'ayaya' in index.get(1, 'AYAYA')
+    assert parse_guess('<:AYAYA:1>', emotes=index) == 'ayaya'
+
+
+@pytest.mark.parametrize('guesses, solution, guess, expected', [
+    (['trace'], 'crane', 'crane', None),
+    (['trace'], 'crane', 'brave', 'Your guess must contain **C**.'),
+    (['trace'], 'crane', 'trice', 'The 3rd letter must be **A**.'),
+    (['eerie'], 'geese', 'seeze', None),
+    (['eerie'], 'geese', 'sedge', 'Your guess must contain **E** 3 times.'),
+    (['speed'], 'geese', 'abets', 'Your guess must contain **E** twice.'),
+    (['stone', 'crane'], 'prank', 'grind', 'The 3rd letter must be **A**.'),
+])
+def test_hard_mode(guesses, solution, guess, expected):
+    assert HardModeConstraints.from_guesses(guesses, solution).violation(guess) == expected
+
+
+@pytest.mark.parametrize('word, expected', [
+    ('cranr', ['crane', 'crank', 'crans']),  # one wrong letter, common words first
+    ('hwllo', ['hello', 'hallo', 'hillo']),
+    ('wrold', ['world', 'woold', 'would']),  # swapped letters count as one mistake
+    ('xqzzt', []),
+])
+def test_suggest(word, expected):
+    assert suggest(word, len(word)) == expected
+
+
+def test_word_schedule():
+    words = [f'word{i}' for i in range(50)]
+    schedule = WordSchedule(1, words)
+    first_pass = [schedule.word(r) for r in range(50)]
+    assert sorted(first_pass) == sorted(words)
+    # The same channel always gets the same words, even from a fresh schedule after a restart
+    assert [WordSchedule(1, words).word(r) for r in range(50)] == first_pass
+    assert [WordSchedule(2, words).word(r) for r in range(50)] != first_pass
+    second_pass = [schedule.word(r) for r in range(50, 100)]
+    assert sorted(second_pass) == sorted(words) and second_pass != first_pass
+    assert schedule.word(3) == first_pass[3]
+
+
+def test_round_number():
+    game_timedelta = timedelta(minutes=1440 / 7)
+    midnight = datetime(2024, 1, 31, tzinfo=timezone.utc)
+    starts = [midnight + game_timedelta * i for i in range(7)] + [midnight + timedelta(days=1)]
+    rounds = [round_number(start, game_timedelta) for start in starts]
+    assert rounds == list(range(rounds[0], rounds[0] + 8))
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import signal
+from datetime import datetime, timezone
+
+import pytest
+
+from harness import FakeContext, FakeGuild, FakeMember, HarnessBot, use_memory_db
+from sakuya import workers
+from sakuya.join_clusters import Joiner
+from sakuya.sentinel import _worker_add_join
+from sakuya.wordle import Wordle
+from sakuya.wordle.game import _worker_index_emotes, _worker_parse_guess, parse_cache_info
+from sakuya.wordle.guess import PARSE_CACHE, Emote, InvalidGuessError
+
+
+def count(guild_id: int) -> int:
+    counter = workers.local('counter', guild_id, lambda: [0])
+    counter[0] += 1
+    return counter[0]
+
+
+@pytest.fixture
+def pool():
+    pool = workers.WorkerPool(2)
+    yield pool
+    pool.shutdown()
+
+
+def test_guilds_are_pinned(pool):
+    async def run():
+        pids = [await pool.run(guild_id, os.getpid) for guild_id in (1, 2, 3, 1)]
+        assert pids[0] == pids[2] == pids[3] != pids[1]
+        assert [await pool.run(1, count, 1) for _ in range(3)] == [1, 2, 3]
+        assert await pool.run(2, count, 2) == 1
+
+    asyncio.run(run())
+
+
+def test_dead_worker_is_replaced(pool):
+    async def run():
+        pid = await pool.run(1, os.getpid)
+        await pool.run(1, count, 1)
+        os.kill(pid, signal.SIGKILL)
+        await asyncio.sleep(0.5)
+        # Work for the dead worker's guilds goes to a fresh one, which starts from scratch
+        new_pid = await pool.run(1, os.getpid)
+        assert new_pid != pid
+        assert await pool.run(1, count, 1) == 1
+        assert await pool.run(3, os.getpid) == new_pid
+
+    asyncio.run(run())
+
+
+def test_cog_work_in_workers(pool):
+    async def run():
+        await pool.run(7, _worker_index_emotes, 7, {5}, [Emote(1, 'lawnmower')])
+        assert await pool.run(7, _worker_parse_guess, 7, '<:lawnmower:1>', 5) == 'mower'
+        with pytest.raises(InvalidGuessError):
+            await pool.run(7, _worker_parse_guess, 7, 'xqzzt', 5)
+
+        now = datetime.now(timezone.utc)
+        joiners = [Joiner(i, f'<@{i}>', f'raider_{i}', now, None) for i in range(3)]
+        clusters = [await pool.run(7, _worker_add_join, 7, j, now) for j in joiners]
+        assert clusters[1] is None and len(clusters[2]) == 3
+
+    asyncio.run(run())
+
+
+def test_parse_cache_info_from_every_worker(pool, monkeypatch):
+    monkeypatch.setattr(workers, 'pool', pool)
+
+    async def run():
+        # Guilds 1 and 2 are pinned to different workers, each with a cache of its own
+        for guild_id in (1, 2, 2):
+            await pool.run(guild_id, _worker_parse_guess, guild_id, 'crane', 5)
+        info = await parse_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+        assert info.maxsize == 2 * PARSE_CACHE.maxsize
+
+    asyncio.run(run())
+
+
+def test_simultaneous_guesses_in_workers(pool, monkeypatch):
+    monkeypatch.setattr(workers, 'pool', pool)
+
+    async def run():
+        await use_memory_db()
+        bot = HarnessBot()
+        guild = FakeGuild(name='Guild')
+        channel = guild.add_channel('wordle')
+        bot.add_guild(guild)
+        wordle = Wordle(bot)
+        await bot.add_cog(wordle)
+        await wordle.on_ready()
+        await wordle.enable(FakeContext(bot, channel, FakeMember(guild=guild, name='mod')))
+        words = ['crane', 'slate', 'pious', 'mound', 'fight', 'bring', 'lucky', 'eagle']
+        # Parsing waits on the worker, so these are all in flight at once
+        await asyncio.gather(*(
+            wordle.guess(FakeContext(bot, channel, FakeMember(guild=guild, name=f'player{i}')), word)
+            for i, word in enumerate(words)
+        ))
+        state = wordle.channels[channel.id]
+        assert len(state.guesses) == len(state.guessers) == 1
+        await bot.close()
+
+    asyncio.run(run())
+
+
+def test_inline_pool_runs_in_process():
+    assert asyncio.run(workers.WorkerPool().run(1, os.getpid)) == os.getpid()